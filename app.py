@@ -15,12 +15,12 @@ import pypdfium2 as pdfium
 # Import backend components
 try:
     from expense_verification_pipeline import expense_pipeline
-    from utils.ocr import extract_text_from_image
+    from utils.ocr import extract_text_from_image, iter_pdf_page_texts
 except ImportError as e:
     # Try alternate import path if first one fails
     try:
         from pipelines.expense_verification_pipeline import expense_pipeline
-        from utils.ocr import extract_text_from_image
+        from utils.ocr import extract_text_from_image, iter_pdf_page_texts
     except ImportError as e2:
         st.error(f"Failed to import backend components: {e2}")
         st.info("Ensure you are running streamlit from the project root and 'backend' directory exists.")
@@ -94,17 +94,13 @@ if uploaded_file:
             if uploaded_file.type == "application/pdf":
                 status_text.text("Rendering PDF...")
                 pdf = pdfium.PdfDocument(tmp_path)
-                page = pdf[0]
-                bitmap = page.render(scale=2)
-                img = bitmap.to_pil()
-                st.image(img, use_container_width=True, caption=f"First page of {uploaded_file.name}")
-                
-                # Save first page as image for OCR
-                ocr_source = tmp_path + ".png"
-                img.save(ocr_source)
+                page_count = len(pdf)
+                img = pdf[0].render(scale=1).to_pil()
+                pdf.close()
+                st.image(img, use_container_width=True,
+                         caption=f"Page 1 of {page_count} - {uploaded_file.name}")
             else:
                 st.image(uploaded_file, use_container_width=True, caption=uploaded_file.name)
-                ocr_source = tmp_path
 
         with col2:
             st.subheader("📊 Analysis Results")
@@ -113,7 +109,15 @@ if uploaded_file:
             status_text.text("Step 1/3: Extracting text using PaddleOCR...")
             progress_bar.progress(33)
             ocr_start = time.time()
-            ocr_text = extract_text_from_image(ocr_source)
+            if uploaded_file.type == "application/pdf":
+                # Every page, not just the first: invoice totals are usually on the last one
+                page_texts = []
+                for page_number, page_text in iter_pdf_page_texts(tmp_path):
+                    page_texts.append(page_text)
+                    status_text.text(f"Step 1/3: Extracting text using PaddleOCR... page {page_number}/{page_count}")
+                ocr_text = "\n\n".join(text for text in page_texts if text)
+            else:
+                ocr_text = extract_text_from_image(tmp_path)
             ocr_end = time.time()
             
             # Step 2: AI Pipeline
@@ -214,11 +218,9 @@ if uploaded_file:
         st.error(f"Error processing document: {str(e)}")
         st.exception(e)
     finally:
-        # Cleanup temporary files
+        # Cleanup temporary file
         if os.path.exists(tmp_path):
             os.remove(tmp_path)
-        if 'ocr_source' in locals() and ocr_source != tmp_path and os.path.exists(ocr_source):
-            os.remove(ocr_source)
 
 else:
     # Welcome Screen
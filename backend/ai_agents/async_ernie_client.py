@@ -0,0 +1,287 @@
+"""
+Async ERNIE 4.5 Client for DocMind AI
+Non-blocking API calls with shared rate and concurrency limits.
+"""
+
+import asyncio
+import json
+import random
+import time
+from typing import Optional
+
+from .ernie_client import (
+    DEFAULT_TOKEN_TTL, MockErnieClient, RETRY_STATUSES, SAFE_RETRY_STATUSES, TOKEN_ERROR_CODES
+)
+
+
+class TokenBucket:
+    """Async token bucket: `rate` acquisitions per second on average, bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._loop = None
+        self._lock = None
+
+    async def acquire(self):
+        """Wait until a token is available and take it."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            # Holding the lock while sleeping keeps waiters in FIFO order
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncErnieClient:
+    """Asyncio client for the Baidu ERNIE 4.5 API, shared by all agents."""
+
+    def __init__(self, api_key: str, secret_key: str, base_url: str = "https://aip.baidubce.com",
+                 model: str = "ernie-4.5-8k", rate_per_second: float = 5.0, burst: Optional[float] = None,
+                 max_in_flight: int = 8, connect_timeout: float = 5.0, request_timeout: float = 60.0,
+                 max_retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 retry_after_max: float = 60.0, token_refresh_margin: float = 300.0):
+        """
+        Initialize the async ERNIE client. Nothing connects until the first call.
+
+        Args:
+            api_key: Baidu API key
+            secret_key: Baidu secret key
+            base_url: API host (overridable for testing)
+            model: Chat model endpoint name
+            rate_per_second: Requests per second allowed across all callers
+                (the provider's QPS limit); retries count too
+            burst: Requests that may start at once after an idle period;
+                the default of 1 spaces requests evenly, which keeps even
+                the first second under a provider's QPS limit
+            max_in_flight: Requests awaiting a response at any time
+            connect_timeout: Seconds to wait for a TCP/TLS connection
+            request_timeout: Seconds one attempt may take before it is
+                cancelled (and its connection dropped)
+            max_retries: Retries after the first attempt. Token requests retry
+                429/5xx, connection errors and timeouts; chat requests only
+                failed connections and 429/502/503/504, so a completion is
+                never generated twice
+            backoff_base: First retry waits up to this many seconds; the cap
+                doubles with every attempt (full jitter)
+            backoff_max: Upper bound of a single backoff wait
+            retry_after_max: Longest Retry-After wait honoured
+            token_refresh_margin: Refresh the access token this many seconds
+                before it expires
+        """
+        self.api_key = api_key
+        self.secret_key = secret_key
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.max_in_flight = max_in_flight
+        self.connect_timeout = connect_timeout
+        self.request_timeout = request_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_after_max = retry_after_max
+        self.token_refresh_margin = token_refresh_margin
+        self.rate_limiter = TokenBucket(rate_per_second, burst if burst is not None else 1)
+
+        self.access_token = None
+        self.token_expires_at = 0.0
+        self._loop = None
+        self._session = None
+        self._session_closer = None
+        self._semaphore = None
+        self._token_lock = None
+
+    def _bind_loop(self):
+        # Sessions and asyncio primitives belong to one event loop; start
+        # fresh when called from a new one (e.g. a later asyncio.run())
+        loop = asyncio.get_running_loop()
+        if loop is self._loop:
+            return
+
+        import aiohttp  # only needed when a real async client is configured
+
+        self._release_session()
+        self._loop = loop
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_in_flight),
+            timeout=aiohttp.ClientTimeout(sock_connect=self.connect_timeout)
+        )
+        # A session can only be closed on its own loop, so close it when
+        # that loop shuts down rather than when the next loop comes along
+        self._session_closer = self._close_at_shutdown(self._session)
+        loop.create_task(self._session_closer.__anext__())
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        self._token_lock = asyncio.Lock()
+
+    @staticmethod
+    async def _close_at_shutdown(session):
+        # Finalized by the loop's shutdown_asyncgens(), which asyncio.run()
+        # calls while the loop can still close the pooled connections
+        try:
+            yield
+        finally:
+            await session.close()
+
+    def _release_session(self):
+        """Let go of the session bound to a previous event loop."""
+        session, loop = self._session, self._loop
+        self._session = None
+        self._session_closer = None
+        if session is None or session.closed:
+            return
+        if loop.is_running():
+            # Still serving another thread: let that loop close it
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+        else:
+            # The loop ended without shutting down its async generators;
+            # its connections went with it, so just detach the session
+            session.detach()
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.retry_after_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def _attempt(self, url: str, **kwargs):
+        async with self._session.post(url, **kwargs) as response:
+            return response.status, response.headers.get("Retry-After"), await response.text()
+
+    async def _post(self, url: str, idempotent: bool = True, **kwargs):
+        """
+        POST within the in-flight and rate limits, cancelling attempts that
+        exceed request_timeout and retrying with jittered backoff. Idempotent
+        requests retry 429/5xx, connection errors and timeouts; others only
+        failed connections and 429/502/503/504. Returns (status, body text).
+        """
+        import aiohttp
+
+        if idempotent:
+            retry_statuses = RETRY_STATUSES
+            retry_errors = (aiohttp.ClientConnectionError, asyncio.TimeoutError)
+        else:
+            # Raised before the request was sent (ConnectionTimeoutError is aiohttp 3.10+)
+            retry_statuses = SAFE_RETRY_STATUSES
+            retry_errors = (aiohttp.ClientConnectorError,
+                            getattr(aiohttp, "ConnectionTimeoutError", aiohttp.ClientConnectorError))
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    await self.rate_limiter.acquire()
+                    status, retry_after, text = await asyncio.wait_for(
+                        self._attempt(url, **kwargs), timeout=self.request_timeout
+                    )
+            except retry_errors:
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            if status in retry_statuses and attempt < self.max_retries:
+                await asyncio.sleep(self._backoff(attempt, retry_after))
+                continue
+            return status, text
+
+    async def _get_access_token(self):
+        """Get access token from Baidu."""
+        url = f"{self.base_url}/oauth/2.0/token"
+        params = {
+            "grant_type": "client_credentials",
+            "client_id": self.api_key,
+            "client_secret": self.secret_key
+        }
+
+        status, text = await self._post(url, params=params)
+        if status == 200:
+            result = json.loads(text)
+            self.access_token = result.get("access_token")
+            self.token_expires_at = time.time() + float(result.get("expires_in") or DEFAULT_TOKEN_TTL)
+        else:
+            raise Exception(f"Failed to get access token: {text}")
+
+    async def _current_token(self, stale: Optional[str] = None) -> str:
+        async with self._token_lock:
+            expiring = time.time() >= self.token_expires_at - self.token_refresh_margin
+            if expiring or (stale is not None and stale == self.access_token):
+                await self._get_access_token()
+            return self.access_token
+
+    async def generate_response(self, prompt: str, max_tokens: int = 1000) -> str:
+        """
+        Generate response from ERNIE 4.5.
+
+        Args:
+            prompt: Input prompt
+            max_tokens: Maximum tokens to generate
+
+        Returns:
+            Generated text response
+        """
+        self._bind_loop()
+        url = f"{self.base_url}/rpc/2.0/ai_custom/v1/wenxinworkshop/chat/{self.model}"
+
+        headers = {
+            "Content-Type": "application/json"
+        }
+
+        payload = {
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "max_tokens": max_tokens
+        }
+        data = json.dumps(payload)
+
+        token = await self._current_token()
+        for _ in range(2):
+            status, text = await self._post(url, idempotent=False, params={"access_token": token},
+                                            headers=headers, data=data)
+            if status != 200:
+                raise Exception(f"ERNIE API error: {text}")
+
+            result = json.loads(text)
+            if result.get("error_code") in TOKEN_ERROR_CODES:
+                # Revoked or expired early: refresh once and resend
+                token = await self._current_token(stale=token)
+                continue
+            if "error_code" in result:
+                raise Exception(f"ERNIE API error: {text}")
+            return result.get("result", "")
+
+        raise Exception(f"ERNIE API error: {text}")
+
+    async def close(self):
+        """Close the pooled connections."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+            self._session_closer = None
+            self._loop = None
+
+
+class MockAsyncErnieClient:
+    """Mock async client for demonstration purposes."""
+
+    def __init__(self):
+        self._mock = MockErnieClient()
+
+    async def generate_response(self, prompt: str, max_tokens: int = 1000) -> str:
+        """Mock response generation."""
+        return self._mock.generate_response(prompt, max_tokens)
+
+
+# Use mock client for demo
+async_ernie_client = MockAsyncErnieClient()
@@ -42,15 +42,12 @@ Return JSON with:
 Return only the JSON object.
 """
 
-    def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+    def build_prompt(self, input_data: Dict[str, Any]) -> str:
         """
-        Generate comprehensive audit summary.
+        Build the audit summary prompt.
 
         Args:
             input_data: Dict containing all analysis results
-
-        Returns:
-            Dict with final audit summary
         """
         # Extract data from input
         vendor = input_data.get('vendor', 'Unknown')
@@ -65,7 +62,7 @@ Return only the JSON object.
         fraud_confidence = int(input_data.get('fraud_confidence', 0) * 100)
         anomaly_score = input_data.get('anomaly_score', 0)
 
-        prompt = self.get_prompt_template().format(
+        return self.get_prompt_template().format(
             vendor=vendor,
             amount=amount,
             category=category,
@@ -78,9 +75,8 @@ Return only the JSON object.
             anomaly_score=f"{anomaly_score:.2f}"
         )
 
-        response = self.call_ernie(prompt)
-        parsed_data = self.parse_json_response(response)
-
+    def build_result(self, input_data: Dict[str, Any], parsed_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Dict with final audit summary."""
         return {
             "agent": self.name,
             "status": parsed_data.get('status', 'Needs Review'),
@@ -5,6 +5,7 @@ Base Agent class for DocMind AI multi-agent system.
 from abc import ABC, abstractmethod
 from typing import Dict, Any
 from .ernie_client import ernie_client
+from .async_ernie_client import async_ernie_client
 
 
 class BaseAgent(ABC):
@@ -19,14 +20,33 @@ class BaseAgent(ABC):
         pass
 
     @abstractmethod
+    def build_prompt(self, input_data: Dict[str, Any]) -> str:
+        """Build the ERNIE prompt for the given input."""
+        pass
+
+    @abstractmethod
+    def build_result(self, input_data: Dict[str, Any], parsed_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Turn the parsed ERNIE response into the agent's result."""
+        pass
+
     def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """Process input data and return results with explanation."""
-        pass
+        response = self.call_ernie(self.build_prompt(input_data))
+        return self.build_result(input_data, self.parse_json_response(response))
+
+    async def aprocess(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Like process(), but awaits the ERNIE call on the shared async client."""
+        response = await self.acall_ernie(self.build_prompt(input_data))
+        return self.build_result(input_data, self.parse_json_response(response))
 
     def call_ernie(self, prompt: str) -> str:
         """Call ERNIE 4.5 with the given prompt."""
         return ernie_client.generate_response(prompt)
 
+    async def acall_ernie(self, prompt: str) -> str:
+        """Call ERNIE 4.5 without blocking the event loop, within the shared rate and concurrency limits."""
+        return await async_ernie_client.generate_response(prompt)
+
     def parse_json_response(self, response: str) -> Dict[str, Any]:
         """Parse JSON response from ERNIE."""
         try:
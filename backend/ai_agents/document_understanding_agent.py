@@ -35,23 +35,18 @@ If a field is not found, use null or empty array as appropriate.
 Return only the JSON object, no additional text.
 """
 
-    def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+    def build_prompt(self, input_data: Dict[str, Any]) -> str:
         """
-        Process OCR text to extract structured expense data.
+        Build the extraction prompt.
 
         Args:
             input_data: Dict containing 'ocr_text'
-
-        Returns:
-            Dict with extracted fields and explanation
         """
         ocr_text = input_data.get('ocr_text', '')
+        return self.get_prompt_template().format(ocr_text=ocr_text)
 
-        prompt = self.get_prompt_template().format(ocr_text=ocr_text)
-        response = self.call_ernie(prompt)
-
-        parsed_data = self.parse_json_response(response)
-
+    def build_result(self, input_data: Dict[str, Any], parsed_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Dict with extracted fields and explanation."""
         return {
             "agent": self.name,
             "extracted_data": parsed_data,
@@ -3,42 +3,141 @@ ERNIE 4.5 Client for DocMind AI
 Handles API calls to Baidu ERNIE 4.5 model.
 """
 
-import requests
 import json
-from typing import Dict, Any
+import random
+import threading
+import time
+from typing import Dict, Any, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Statuses worth retrying: rate limiting and transient server/proxy errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Chat calls are only retried when the request cannot have produced (and
+# been billed for) a completion; after a 500 or a read timeout it may have
+SAFE_RETRY_STATUSES = {429, 502, 503, 504}
+
+# Token lifetime assumed when the token response carries no expires_in
+DEFAULT_TOKEN_TTL = 3600.0
+
+# Baidu reports bad or expired tokens in a 200 response body
+TOKEN_ERROR_CODES = {110, 111}
 
 
 class ErnieClient:
     """Client for interacting with Baidu ERNIE 4.5 API."""
 
-    def __init__(self, api_key: str, secret_key: str):
+    def __init__(self, api_key: str, secret_key: str, base_url: str = "https://aip.baidubce.com",
+                 model: str = "ernie-4.5-8k", connect_timeout: float = 5.0, read_timeout: float = 60.0,
+                 max_retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 retry_after_max: float = 60.0, pool_size: int = 10, token_refresh_margin: float = 300.0):
         """
         Initialize ERNIE client.
 
         Args:
             api_key: Baidu API key
             secret_key: Baidu secret key
+            base_url: API host (overridable for testing)
+            model: Chat model endpoint name
+            connect_timeout: Seconds to wait for a TCP/TLS connection
+            read_timeout: Seconds to wait for the response once connected
+            max_retries: Retries after the first attempt. Token requests retry
+                429/5xx, connection errors and timeouts; chat requests only
+                connection errors and 429/502/503/504, so a completion is
+                never generated twice
+            backoff_base: First retry waits up to this many seconds; the cap
+                doubles with every attempt (full jitter)
+            backoff_max: Upper bound of a single backoff wait
+            retry_after_max: Longest Retry-After wait honoured
+            pool_size: Keep-alive connections kept open to the API host
+            token_refresh_margin: Refresh the access token this many seconds
+                before it expires
         """
         self.api_key = api_key
         self.secret_key = secret_key
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_after_max = retry_after_max
+        self.token_refresh_margin = token_refresh_margin
+
+        # One session for all calls, so requests reuse pooled keep-alive connections
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
         self.access_token = None
+        self.token_expires_at = 0.0
+        self._token_lock = threading.Lock()
         self._get_access_token()
 
+    def _backoff(self, attempt: int, response: Optional[requests.Response] = None) -> float:
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.retry_after_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _request(self, method: str, url: str, idempotent: bool = True, **kwargs) -> requests.Response:
+        """
+        Send a request, retrying with jittered backoff. Idempotent requests
+        retry 429/5xx responses, connection errors and timeouts; others only
+        failures where the server cannot have acted on the request:
+        connection errors (including connect timeouts) and 429/502/503/504.
+        """
+        retry_statuses = RETRY_STATUSES if idempotent else SAFE_RETRY_STATUSES
+        # ConnectTimeout is a ConnectionError; ReadTimeout is not
+        retry_errors = (requests.ConnectionError, requests.Timeout) if idempotent else (requests.ConnectionError,)
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            except retry_errors:
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self._backoff(attempt))
+                continue
+
+            if response.status_code in retry_statuses and attempt < self.max_retries:
+                time.sleep(self._backoff(attempt, response))
+                continue
+            return response
+
     def _get_access_token(self):
         """Get access token from Baidu."""
-        url = "https://aip.baidubce.com/oauth/2.0/token"
+        url = f"{self.base_url}/oauth/2.0/token"
         params = {
             "grant_type": "client_credentials",
             "client_id": self.api_key,
             "client_secret": self.secret_key
         }
 
-        response = requests.post(url, params=params)
+        response = self._request("POST", url, params=params)
         if response.status_code == 200:
-            self.access_token = response.json().get("access_token")
+            result = response.json()
+            self.access_token = result.get("access_token")
+            self.token_expires_at = time.time() + float(result.get("expires_in") or DEFAULT_TOKEN_TTL)
         else:
             raise Exception(f"Failed to get access token: {response.text}")
 
+    def _current_token(self, stale: Optional[str] = None) -> str:
+        """
+        The access token, refreshed first if it expires within
+        token_refresh_margin seconds or the API rejected `stale`.
+        """
+        with self._token_lock:
+            expiring = time.time() >= self.token_expires_at - self.token_refresh_margin
+            # Another thread may already have replaced the rejected token
+            if expiring or (stale is not None and stale == self.access_token):
+                self._get_access_token()
+            return self.access_token
+
     def generate_response(self, prompt: str, max_tokens: int = 1000) -> str:
         """
         Generate response from ERNIE 4.5.
@@ -50,14 +149,13 @@ class ErnieClient:
         Returns:
             Generated text response
         """
-        url = "https://aip.baidubce.com/rpc/2.0/ai_custom/v1/wenxinworkshop/chat/ernie-4.5-8k"
+        url = f"{self.base_url}/rpc/2.0/ai_custom/v1/wenxinworkshop/chat/{self.model}"
 
         headers = {
             "Content-Type": "application/json"
         }
 
         payload = {
-            "access_token": self.access_token,
             "messages": [
                 {
                     "role": "user",
@@ -66,14 +164,29 @@ class ErnieClient:
             ],
             "max_tokens": max_tokens
         }
+        data = json.dumps(payload)
 
-        response = requests.post(url, headers=headers, data=json.dumps(payload))
+        token = self._current_token()
+        for _ in range(2):
+            response = self._request("POST", url, idempotent=False, params={"access_token": token},
+                                     headers=headers, data=data)
+            if response.status_code != 200:
+                raise Exception(f"ERNIE API error: {response.text}")
 
-        if response.status_code == 200:
             result = response.json()
+            if result.get("error_code") in TOKEN_ERROR_CODES:
+                # Revoked or expired early: refresh once and resend
+                token = self._current_token(stale=token)
+                continue
+            if "error_code" in result:
+                raise Exception(f"ERNIE API error: {response.text}")
             return result.get("result", "")
-        else:
-            raise Exception(f"ERNIE API error: {response.text}")
+
+        raise Exception(f"ERNIE API error: {response.text}")
+
+    def close(self):
+        """Close the pooled connections."""
+        self.session.close()
 
 
 # For demo purposes, create a mock client
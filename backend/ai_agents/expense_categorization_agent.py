@@ -44,31 +44,27 @@ Please return a JSON object with:
 Return only the JSON object.
 """
 
-    def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+    def build_prompt(self, input_data: Dict[str, Any]) -> str:
         """
-        Categorize the expense and provide reasoning.
+        Build the categorization prompt.
 
         Args:
             input_data: Dict containing vendor, amount, items, etc.
-
-        Returns:
-            Dict with category and explanation
         """
         vendor = input_data.get('vendor', 'Unknown')
         amount = input_data.get('amount', 0)
         items = input_data.get('items', [])
         description = input_data.get('description', '')
 
-        prompt = self.get_prompt_template().format(
+        return self.get_prompt_template().format(
             vendor=vendor,
             amount=amount,
             items=', '.join(items) if items else 'Not specified',
             description=description
         )
 
-        response = self.call_ernie(prompt)
-        parsed_data = self.parse_json_response(response)
-
+    def build_result(self, input_data: Dict[str, Any], parsed_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Dict with category and explanation."""
         return {
             "agent": self.name,
             "category": parsed_data.get('category', 'Miscellaneous'),
@@ -47,15 +47,12 @@ Return JSON with:
 Return only the JSON object.
 """
 
-    def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+    def build_prompt(self, input_data: Dict[str, Any]) -> str:
         """
-        Analyze transaction for fraud and consistency.
+        Build the fraud and consistency analysis prompt.
 
         Args:
             input_data: Dict containing transaction data and history
-
-        Returns:
-            Dict with fraud analysis results
         """
         vendor = input_data.get('vendor', 'Unknown')
         amount = input_data.get('amount', 0)
@@ -69,7 +66,7 @@ Return only the JSON object.
             for h in history[:10]  # Limit to last 10
         ]) if history else "No historical data available"
 
-        prompt = self.get_prompt_template().format(
+        return self.get_prompt_template().format(
             vendor=vendor,
             amount=amount,
             category=category,
@@ -77,9 +74,8 @@ Return only the JSON object.
             history=history_text
         )
 
-        response = self.call_ernie(prompt)
-        parsed_data = self.parse_json_response(response)
-
+    def build_result(self, input_data: Dict[str, Any], parsed_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Dict with fraud analysis results."""
         return {
             "agent": self.name,
             "is_fraudulent": parsed_data.get('is_fraudulent', False),
@@ -1,20 +1,39 @@
 from collections import deque
+import atexit
+import base64
+import csv
 from datetime import datetime, timedelta
+from functools import wraps
+import hashlib
+import io
+import json
 import os
 import re
-from typing import Dict
+import shutil
+import time
+import zipfile
+import zlib
+from typing import Dict, Optional
 from uuid import uuid4
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory, make_response, stream_with_context
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash, check_password_hash
 from transformers import pipeline
 from dotenv import load_dotenv
 
-from utils.ocr import extract_text_from_image
-from utils.classifier import load_categories, classify_text
+from utils.ocr import extract_text, extract_texts_from_images, get_ocr_cache, get_ocr_timings
+from utils.classifier import classify_text_with_score, classify_texts_with_scores
+from utils.model_registry import model_registry
+from utils.response_cache import ResponseCache
+from utils.migrations import run_migrations
+from utils.db_tuning import engine_options, sqlite_pragmas, apply_sqlite_pragmas
+from services.job_queue import JobQueue
+from services.audit_log_writer import AuditLogWriter
 
 # Load environment variables
 load_dotenv()
@@ -32,10 +51,37 @@ database_url = os.getenv('DATABASE_URL', 'sqlite:///expenses.db')
 if database_url.startswith("postgres://"):
     database_url = database_url.replace("postgres://", "postgresql://", 1)
 
+# Connection tuning. SQLITE_PROFILE=performance turns on WAL and related
+# pragmas for SQLite; the DB_POOL_* settings apply to Postgres
+SQLITE_PROFILE = os.getenv('SQLITE_PROFILE', 'performance').lower()
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+SQLITE_CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', 65536))
+SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 268435456))
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 30))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+
 app.config['SQLALCHEMY_DATABASE_URI'] = database_url
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(
+    database_url,
+    sqlite_profile=SQLITE_PROFILE,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    busy_timeout_ms=SQLITE_BUSY_TIMEOUT_MS
+)
 db = SQLAlchemy(app)
 
+if SQLITE_PROFILE == "performance":
+    with app.app_context():
+        apply_sqlite_pragmas(db.engine, sqlite_pragmas(SQLITE_BUSY_TIMEOUT_MS, SQLITE_CACHE_SIZE_KB,
+                                                       SQLITE_MMAP_SIZE))
+
 # ------------------------
 # File Serving Route FIXED
 # ------------------------
@@ -52,13 +98,58 @@ def serve_uploads(filename):
 UPLOAD_FOLDER = "uploads"
 LOGO_FOLDER = os.path.join(UPLOAD_FOLDER, "logos")
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+RECEIPT_EXTENSIONS = ALLOWED_EXTENSIONS | {'pdf'}
 MAX_LOGO_SIZE = 5 * 1024 * 1024  # 5MB
 
 
+# OCR processing mode: "sync" handles uploads inside the request, "queue"
+# hands them to ocr_worker.py processes through a local SQLite job queue
+OCR_MODE = os.getenv('OCR_MODE', 'sync').lower()
+OCR_WORKERS = int(os.getenv('OCR_WORKERS', 2))
+OCR_QUEUE_PATH = os.getenv('OCR_QUEUE_PATH', os.path.join("instance", "ocr_jobs.db"))
+OCR_JOB_TIMEOUT = int(os.getenv('OCR_JOB_TIMEOUT', 600))
+_ocr_job_queue = None
+
+# Batch uploads (/ocr/batch)
+MAX_BATCH_FILES = int(os.getenv('MAX_BATCH_FILES', 500))
+# Uncompressed size limits for zip members, checked before anything is extracted
+MAX_BATCH_FILE_BYTES = int(os.getenv('MAX_BATCH_FILE_BYTES', 25 * 1024 * 1024))
+MAX_BATCH_BYTES = int(os.getenv('MAX_BATCH_BYTES', 500 * 1024 * 1024))
+OCR_BATCH_WORKERS = int(os.getenv('OCR_BATCH_WORKERS', os.cpu_count() or 1))
+
+
+# Dashboard response cache. Entries are dropped whenever the rows an
+# endpoint reads change (in any process, through the data_generation rows)
+# and at least every RESPONSE_CACHE_TTL seconds
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 256))
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 300))
+response_cache = ResponseCache(RESPONSE_CACHE_MAX_ENTRIES)
+
+
+# Activity logging. "buffered" writes routine audit entries in background
+# batches; "transactional" writes every entry in the caller's transaction
+AUDIT_LOG_MODE = os.getenv('AUDIT_LOG_MODE', 'buffered').lower()
+AUDIT_LOG_FLUSH_INTERVAL = float(os.getenv('AUDIT_LOG_FLUSH_INTERVAL', 2))
+AUDIT_LOG_BATCH_SIZE = int(os.getenv('AUDIT_LOG_BATCH_SIZE', 100))
+
+
+def get_ocr_job_queue() -> JobQueue:
+    """The OCR job queue, opened on first use so sync mode never creates the file."""
+    global _ocr_job_queue
+    if _ocr_job_queue is None:
+        _ocr_job_queue = JobQueue(OCR_QUEUE_PATH, visibility_timeout=OCR_JOB_TIMEOUT)
+    return _ocr_job_queue
+
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def allowed_receipt(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in RECEIPT_EXTENSIONS
+
+
 # ------------------------
 # Database Models
 # ------------------------
@@ -72,19 +163,101 @@ class Expense(db.Model):
     text_preview = db.Column(db.Text)
     status = db.Column(db.String(50), default="Processed")
 
+    __table_args__ = (
+        # Serves the duplicate check in detect_anomalies (equality on the first
+        # three columns, range on uploaded_at)
+        db.Index("ix_expense_duplicate_lookup", vendor, amount, category, uploaded_at),
+        db.Index("ix_expense_vendor_lower", db.func.lower(vendor)),
+        # Keyset pagination of /expenses
+        db.Index("ix_expense_uploaded_at_id", uploaded_at, id),
+        # Category filters, newest first
+        db.Index("ix_expense_category_uploaded_at", category, uploaded_at),
+    )
+
     def to_dict(self):
+        return Expense.row_to_dict(self)
+
+    @staticmethod
+    def row_to_dict(row):
+        """to_dict for an instance or a selected row of the expense columns."""
         return {
-            "id": self.id,
-            "file": self.filename,
-            "uploadedAt": self.uploaded_at.isoformat() + "Z",
-            "category": self.category,
-            "vendor": self.vendor,
-            "total": self.amount,
-            "textPreview": self.text_preview,
-            "status": self.status
+            "id": row.id,
+            "file": row.filename,
+            "uploadedAt": row.uploaded_at.isoformat() + "Z" if row.uploaded_at else None,
+            "category": row.category,
+            "vendor": row.vendor,
+            "total": row.amount,
+            "textPreview": row.text_preview,
+            "status": row.status
         }
 
 
+class CategoryStats(db.Model):
+    """Running amount statistics per category, kept in step with Expense inserts."""
+    category = db.Column(db.String(100), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    mean = db.Column(db.Float, nullable=False, default=0.0)
+    m2 = db.Column(db.Float, nullable=False, default=0.0)
+    min_amount = db.Column(db.Float)
+    max_amount = db.Column(db.Float)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def add(self, amount: float):
+        """Fold one amount into the running stats (Welford's update)."""
+        self.count = (self.count or 0) + 1
+        delta = amount - (self.mean or 0.0)
+        self.mean = (self.mean or 0.0) + delta / self.count
+        self.m2 = (self.m2 or 0.0) + delta * (amount - self.mean)
+        self.min_amount = amount if self.min_amount is None else min(self.min_amount, amount)
+        self.max_amount = amount if self.max_amount is None else max(self.max_amount, amount)
+
+    @property
+    def std_dev(self) -> float:
+        # Population standard deviation, matching the original per-upload computation
+        return (self.m2 / self.count) ** 0.5 if self.count and self.count > 1 else 0
+
+    def snapshot(self) -> Dict:
+        return {
+            "count": self.count or 0,
+            "mean": self.mean or 0.0,
+            "std_dev": self.std_dev,
+            "min": self.min_amount,
+            "max": self.max_amount
+        }
+
+
+class Vendor(db.Model):
+    """Vendor dimension keyed by normalized name, with occurrence counts."""
+    normalized_name = db.Column(db.String(255), primary_key=True)
+    display_name = db.Column(db.String(255))
+    occurrence_count = db.Column(db.Integer, nullable=False, default=0)
+    first_seen = db.Column(db.DateTime, default=datetime.utcnow)
+    last_seen = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            "name": self.display_name,
+            "normalizedName": self.normalized_name,
+            "occurrences": self.occurrence_count,
+            "firstSeen": self.first_seen.isoformat() + "Z" if self.first_seen else None,
+            "lastSeen": self.last_seen.isoformat() + "Z" if self.last_seen else None
+        }
+
+
+class MonthlyRollup(db.Model):
+    """Per (month, category) expense totals, kept in step with Expense inserts and newly flagged expenses."""
+    month = db.Column(db.String(7), primary_key=True)  # "YYYY-MM"
+    category = db.Column(db.String(100), primary_key=True)
+    total_amount = db.Column(db.Float, nullable=False, default=0.0)
+    expense_count = db.Column(db.Integer, nullable=False, default=0)
+    flagged_count = db.Column(db.Integer, nullable=False, default=0)
+    flagged_amount = db.Column(db.Float, nullable=False, default=0.0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def totals(self) -> tuple:
+        return (self.total_amount, self.expense_count, self.flagged_count, self.flagged_amount)
+
+
 class UserSettings(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     role = db.Column(db.String(50), nullable=False)
@@ -114,6 +287,10 @@ class UserSettings(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index("ix_user_settings_role", role),
+    )
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -163,12 +340,24 @@ class AnomalyDetection(db.Model):
     detected_at = db.Column(db.DateTime, default=datetime.utcnow)
     status = db.Column(db.String(50), default="Pending")
 
+    __table_args__ = (
+        # Joins and NOT EXISTS lookups from expenses
+        db.Index("ix_anomaly_detection_expense_id", expense_id),
+        # Keyset pagination of /anomalies
+        db.Index("ix_anomaly_detection_detected_at_id", detected_at, id),
+        db.Index("ix_anomaly_detection_status", status),
+    )
+
+    # Loaded in the same query so serializing a list of anomalies doesn't
+    # issue one extra SELECT per row
+    expense = db.relationship("Expense", lazy="joined")
+
     def to_dict(self):
-        expense = Expense.query.get(self.expense_id)
+        expense = self.expense
         return {
             "id": self.id,
             "expenseId": self.expense_id,
-            "dateTime": expense.uploaded_at.isoformat() + "Z" if expense else None,
+            "dateTime": expense.uploaded_at.isoformat() + "Z" if expense and expense.uploaded_at else None,
             "vendorName": expense.vendor if expense else "",
             "category": expense.category if expense else "",
             "amount": expense.amount if expense else 0,
@@ -191,6 +380,10 @@ class ActivityLog(db.Model):
     expense_id = db.Column(db.Integer, db.ForeignKey('expense.id'))
     ip_address = db.Column(db.String(50))
 
+    __table_args__ = (
+        db.Index("ix_activity_log_timestamp", timestamp),
+    )
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -228,24 +421,202 @@ class User(db.Model):
         }
 
 
+class DataGeneration(db.Model):
+    """Counters bumped after every commit that changes the tables the dashboards read (see cached_response)."""
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+
+def upsert_statement(model, values: Dict, update: Dict):
+    """
+    INSERT ... ON CONFLICT (primary key) DO UPDATE for the model's table, on
+    SQLite and Postgres. `values` is the row to insert; `update` is applied
+    to the existing row instead, and column expressions in it see that row's
+    current values. Unlike a select followed by an insert, concurrent callers
+    cannot both try to insert the same key.
+    """
+    table = model.__table__
+    insert = postgresql_insert if db.engine.dialect.name == "postgresql" else sqlite_insert
+    return insert(table).values(**values).on_conflict_do_update(
+        index_elements=list(table.primary_key.columns),
+        set_=update
+    )
+
+
 # ------------------------
 # Load NLP Models
 # ------------------------
-try:
-    ner_pipeline = pipeline("ner", aggregation_strategy="simple")
-except Exception:
-    ner_pipeline = None
+# Models load on first use through the registry; MODEL_WARMUP=all (or a
+# comma-separated list of names) loads them up front instead
+model_registry.register("ner", lambda: pipeline("ner", aggregation_strategy="simple"))
 
-try:
-    sentiment_pipeline = pipeline("sentiment-analysis")
-except Exception:
-    sentiment_pipeline = None
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "")
+if MODEL_WARMUP:
+    model_registry.warm_up(None if MODEL_WARMUP == "all" else MODEL_WARMUP.split(","))
 
 # Limit recent uploads
 RECENT_UPLOAD_LIMIT = 20
 recent_uploads = deque(maxlen=RECENT_UPLOAD_LIMIT)
 
 
+# ------------------------
+# Response Cache
+# ------------------------
+DASHBOARD_GENERATION = "dashboard"
+ACTIVITY_GENERATION = "activity"
+
+# Generation -> models whose changes bump it. Audit log writes (logins
+# included) only invalidate the endpoints that show the audit trail
+GENERATION_MODELS = {
+    DASHBOARD_GENERATION: (Expense, AnomalyDetection),
+    ACTIVITY_GENERATION: (ActivityLog,),
+}
+
+
+def bump_data_generations(names):
+    """
+    Increment the named generations in a short transaction of their own.
+
+    Called once the writing transaction has committed, so writers never
+    queue on the shared counter rows while holding their own locks. A
+    reader that looks up the generation between the two commits caches
+    fresh rows under the old generation, which is harmless.
+    """
+    value = DataGeneration.__table__.c.value
+    try:
+        with db.engine.begin() as connection:
+            for name in sorted(names):
+                connection.execute(upsert_statement(DataGeneration, values={"name": name, "value": 1},
+                                                    update={"value": value + 1}))
+    except Exception as e:
+        # The data is already committed; cached responses expire with RESPONSE_CACHE_TTL
+        print(f"Error bumping data generations {sorted(names)}: {str(e)}")
+
+
+@db.event.listens_for(db.session, "after_flush")
+def track_changed_generations(session, flush_context):
+    changed = session.new | session.dirty | session.deleted
+    for name, models in GENERATION_MODELS.items():
+        if any(isinstance(obj, models) for obj in changed):
+            session.info.setdefault("changed_generations", set()).add(name)
+
+
+@db.event.listens_for(db.session, "after_commit")
+def bump_changed_generations(session):
+    names = session.info.pop("changed_generations", None)
+    if names:
+        bump_data_generations(names)
+
+
+@db.event.listens_for(db.session, "after_soft_rollback")
+def forget_changed_generations(session, previous_transaction):
+    session.info.pop("changed_generations", None)
+
+
+def current_data_generations(names) -> tuple:
+    values = dict(db.session.query(DataGeneration.name, DataGeneration.value)
+                  .filter(DataGeneration.name.in_(names)))
+    return tuple(values.get(name, 0) for name in names)
+
+
+def cached_response(view=None, generations=(DASHBOARD_GENERATION,)):
+    """
+    Serve a GET endpoint from response_cache while the data is unchanged.
+
+    The ETag is derived from the endpoint, its query args and the
+    `generations` it depends on, so a client whose If-None-Match still
+    matches gets a 304 without the view (or even the cache) being touched.
+    Use as @cached_response, or @cached_response(generations=...) for
+    endpoints reading more than the dashboard tables.
+    """
+    if view is None:
+        return lambda view: cached_response(view, generations)
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not RESPONSE_CACHE_ENABLED:
+            return view(*args, **kwargs)
+
+        key = (request.path, tuple(sorted(request.args.items(multi=True))))
+        epoch = int(time.time() // RESPONSE_CACHE_TTL) if RESPONSE_CACHE_TTL > 0 else 0
+        version = (current_data_generations(generations), epoch)
+        etag = hashlib.sha1(repr((key, version)).encode("utf-8")).hexdigest()
+
+        if etag in request.if_none_match:
+            response = app.response_class(status=304)
+        else:
+            entry = response_cache.get(key, version)
+            if entry is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                response_cache.put(key, version, response.get_data(), response.mimetype)
+            else:
+                response = app.response_class(entry["body"], mimetype=entry["mimetype"])
+
+        response.set_etag(etag)
+        # Let clients keep the body but always revalidate
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+
+    return wrapper
+
+
+# ------------------------
+# Activity Logging
+# ------------------------
+def write_activity_logs(entries: list):
+    """Insert a batch of buffered ActivityLog rows in one transaction."""
+    with app.app_context():
+        try:
+            db.session.execute(ActivityLog.__table__.insert(), entries)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        bump_data_generations({ACTIVITY_GENERATION})
+
+
+activity_writer = AuditLogWriter(write_activity_logs, batch_size=AUDIT_LOG_BATCH_SIZE,
+                                 flush_interval=AUDIT_LOG_FLUSH_INTERVAL)
+atexit.register(activity_writer.close)
+
+
+def record_activity(activity: ActivityLog, durable: bool = False):
+    """
+    Record an audit log entry.
+
+    With `durable=True` (or AUDIT_LOG_MODE=transactional) the entry is added
+    to the current session and commits or rolls back with the caller's
+    changes. Otherwise it is handed to the buffered writer once the current
+    transaction commits (and dropped if it rolls back), and reaches the
+    database within AUDIT_LOG_FLUSH_INTERVAL seconds without a commit of
+    its own on the request path.
+    """
+    if durable or AUDIT_LOG_MODE == "transactional":
+        db.session.add(activity)
+        return
+
+    entry = {c.name: getattr(activity, c.name) for c in ActivityLog.__table__.columns if c.name != "id"}
+    entry["timestamp"] = entry["timestamp"] or datetime.utcnow()
+    session = db.session()
+    if not session.in_transaction():
+        # So a rollback() before the next commit fires after_soft_rollback
+        session.begin()
+    session.info.setdefault("buffered_activity", []).append(entry)
+
+
+@db.event.listens_for(db.session, "after_commit")
+def queue_buffered_activity(session):
+    for entry in session.info.pop("buffered_activity", []):
+        activity_writer.log(entry)
+
+
+@db.event.listens_for(db.session, "after_soft_rollback")
+def drop_buffered_activity(session, previous_transaction):
+    session.info.pop("buffered_activity", None)
+
+
 # ------------------------
 # Helper Functions
 # ------------------------
@@ -330,6 +701,7 @@ def extract_vendor(text: str) -> str:
         return ""
 
     # Try NER first if available
+    ner_pipeline = model_registry.get("ner")
     if ner_pipeline is not None:
         try:
             entities = ner_pipeline(text[:512])
@@ -370,105 +742,483 @@ def extract_vendor(text: str) -> str:
     return lines[0] if lines else ""
 
 
-def detect_anomalies(expense_id: int, amount: float, vendor: str, category: str, uploaded_at) -> list:
-    """Detect anomalies in the expense and create AnomalyDetection records"""
-    anomalies = []
-    
+EMPTY_CATEGORY_STATS = {"count": 0, "mean": 0.0, "std_dev": 0, "min": None, "max": None}
+
+
+def record_category_amount(category: str, amount: float) -> Dict:
+    """
+    Fold a new expense amount into its category's running stats.
+
+    Must be called in the same session as the Expense insert so both land in
+    one commit. Returns the stats as they were before this amount was added,
+    which is the baseline detect_anomalies compares the new expense against.
+    """
+    if not category:
+        return dict(EMPTY_CATEGORY_STATS)
+
+    stats = db.session.get(CategoryStats, category, populate_existing=True)
+    baseline = stats.snapshot() if stats else dict(EMPTY_CATEGORY_STATS)
+
+    # Non-positive amounts never took part in the category baseline
+    if amount and amount > 0:
+        # CategoryStats.add() as a single upsert, so concurrent uploads to the
+        # same category neither lose updates nor race to insert the row
+        columns = CategoryStats.__table__.c
+        count = columns["count"] + 1
+        mean = columns["mean"] + (amount - columns["mean"]) / count
+        now = datetime.utcnow()
+        db.session.execute(upsert_statement(
+            CategoryStats,
+            values={"category": category, "count": 1, "mean": amount, "m2": 0.0,
+                    "min_amount": amount, "max_amount": amount, "updated_at": now},
+            update={
+                "count": count,
+                "mean": mean,
+                "m2": columns["m2"] + (amount - columns["mean"]) * (amount - mean),
+                "min_amount": db.case((columns["min_amount"] <= amount, columns["min_amount"]), else_=amount),
+                "max_amount": db.case((columns["max_amount"] >= amount, columns["max_amount"]), else_=amount),
+                "updated_at": now
+            }
+        ))
+
+    return baseline
+
+
+def normalize_vendor(vendor: str) -> str:
+    return (vendor or "").strip().lower()
+
+
+def record_vendor(vendor: str, seen_at=None) -> int:
+    """
+    Count one more occurrence of a vendor in the Vendor dimension.
+
+    Like record_category_amount, this belongs in the Expense insert's
+    transaction. Returns how many times the vendor had been seen before.
+    """
+    normalized = normalize_vendor(vendor)
+    if not normalized:
+        return 0
+
+    seen_at = seen_at or datetime.utcnow()
+    occurrences = Vendor.__table__.c.occurrence_count
+    count = db.session.execute(upsert_statement(
+        Vendor,
+        values={"normalized_name": normalized, "display_name": vendor.strip(),
+                "occurrence_count": 1, "first_seen": seen_at, "last_seen": seen_at},
+        update={"occurrence_count": occurrences + 1, "last_seen": seen_at}
+    ).returning(occurrences)).scalar_one()
+    return count - 1
+
+
+def rebuild_vendors() -> int:
+    """Recompute the Vendor dimension from the full Expense history."""
+    Vendor.query.delete()
+    db.session.flush()
+
+    rebuilt = {}
+    rows = db.session.query(
+        Expense.vendor,
+        db.func.count(Expense.id),
+        db.func.min(Expense.uploaded_at),
+        db.func.max(Expense.uploaded_at)
+    ).filter(Expense.vendor.isnot(None)).group_by(Expense.vendor)
+
+    for vendor, count, first_seen, last_seen in rows:
+        normalized = normalize_vendor(vendor)
+        if not normalized:
+            continue
+        row = rebuilt.get(normalized)
+        if row is None:
+            rebuilt[normalized] = Vendor(normalized_name=normalized, display_name=vendor.strip(),
+                                         occurrence_count=count, first_seen=first_seen, last_seen=last_seen)
+        else:
+            row.occurrence_count += count
+            row.first_seen = min(filter(None, (row.first_seen, first_seen)), default=None)
+            row.last_seen = max(filter(None, (row.last_seen, last_seen)), default=None)
+
+    db.session.add_all(rebuilt.values())
+    db.session.commit()
+    return len(rebuilt)
+
+
+def rebuild_category_stats() -> int:
+    """Recompute the CategoryStats table from the full Expense history."""
+    CategoryStats.query.delete()
+    db.session.flush()
+
+    rebuilt = {}
+    rows = db.session.query(Expense.category, Expense.amount).filter(
+        Expense.category.isnot(None),
+        Expense.amount > 0
+    ).order_by(Expense.id).yield_per(1000)
+
+    for category, amount in rows:
+        stats = rebuilt.get(category)
+        if stats is None:
+            stats = CategoryStats(category=category, count=0, mean=0.0, m2=0.0)
+            rebuilt[category] = stats
+        stats.add(amount)
+
+    db.session.add_all(rebuilt.values())
+    db.session.commit()
+    return len(rebuilt)
+
+
+# granularity -> (SQLite strftime format, Postgres to_char format, Python strftime format)
+TIME_BUCKET_FORMATS = {
+    "hour": ("%Y-%m-%d %H:00", "YYYY-MM-DD HH24:00", "%Y-%m-%d %H:00"),
+    "day": ("%Y-%m-%d", "YYYY-MM-DD", "%Y-%m-%d"),
+    "month": ("%Y-%m", "YYYY-MM", "%Y-%m"),
+}
+
+
+def time_bucket(column, granularity: str):
+    """SQL expression formatting a datetime column as its hour, day or month label on SQLite and Postgres."""
+    sqlite_format, postgres_format, _ = TIME_BUCKET_FORMATS[granularity]
+    if db.engine.dialect.name == "sqlite":
+        return db.func.strftime(sqlite_format, column)
+    return db.func.to_char(column, postgres_format)
+
+
+def month_bucket(column):
+    """SQL expression formatting a datetime column as 'YYYY-MM' on SQLite and Postgres."""
+    return time_bucket(column, "month")
+
+
+def rollup_key(uploaded_at, category: str) -> tuple:
+    # Same fallbacks the trend endpoints used when grouping expenses by hand
+    month = uploaded_at.strftime("%Y-%m") if uploaded_at else "2024-11"
+    return month, category or "Other"
+
+
+def record_monthly_rollup(uploaded_at, category: str, amount: float, expenses: int = 0, flagged: bool = False):
+    """
+    Apply an expense insert (`expenses=1`) and/or its first anomaly
+    (`flagged=True`) to the MonthlyRollup row for its month and category.
+    Must be called in the same session as the change it records.
+
+    An expense counts as flagged while it has any AnomalyDetection row,
+    whatever that anomaly's review status, and nothing in the app deletes
+    anomalies, so the flagged totals only ever grow. Code that removes an
+    expense's anomalies must call rebuild_monthly_rollup() afterwards.
+    """
+    month, category = rollup_key(uploaded_at, category)
+    amount = amount or 0.0
+    flagged_count = 1 if flagged else 0
+    columns = MonthlyRollup.__table__.c
+    now = datetime.utcnow()
+
+    db.session.execute(upsert_statement(
+        MonthlyRollup,
+        values={"month": month, "category": category, "total_amount": amount * expenses,
+                "expense_count": expenses, "flagged_count": flagged_count,
+                "flagged_amount": amount * flagged_count, "updated_at": now},
+        update={
+            "total_amount": columns.total_amount + amount * expenses,
+            "expense_count": columns.expense_count + expenses,
+            "flagged_count": columns.flagged_count + flagged_count,
+            "flagged_amount": columns.flagged_amount + amount * flagged_count,
+            "updated_at": now
+        }
+    ))
+
+
+def compute_monthly_rollup() -> Dict[tuple, tuple]:
+    """Aggregate the Expense and AnomalyDetection tables into rollup totals, keyed like MonthlyRollup."""
+    month = db.func.coalesce(month_bucket(Expense.uploaded_at), "2024-11")
+    category = db.func.coalesce(Expense.category, "Other")
+    amount = db.func.coalesce(Expense.amount, 0.0)
+    flagged = db.exists().where(AnomalyDetection.expense_id == Expense.id)
+
+    rows = db.session.query(
+        month,
+        category,
+        db.func.coalesce(db.func.sum(amount), 0.0),
+        db.func.count(Expense.id),
+        db.func.sum(db.case((flagged, 1), else_=0)),
+        db.func.sum(db.case((flagged, amount), else_=0.0))
+    ).group_by(month, category)
+
+    return {(m, c): (total, count, flagged_count or 0, flagged_amount or 0.0)
+            for m, c, total, count, flagged_count, flagged_amount in rows}
+
+
+def rebuild_monthly_rollup() -> int:
+    """Recompute the MonthlyRollup table from the full Expense history."""
+    MonthlyRollup.query.delete()
+    db.session.flush()
+
+    rows = [
+        MonthlyRollup(month=month, category=category, total_amount=total, expense_count=count,
+                      flagged_count=flagged_count, flagged_amount=flagged_amount)
+        for (month, category), (total, count, flagged_count, flagged_amount) in compute_monthly_rollup().items()
+    ]
+    db.session.add_all(rows)
+    db.session.commit()
+    return len(rows)
+
+
+def check_monthly_rollup(tolerance: float = 0.005) -> list:
+    """
+    Compare the stored MonthlyRollup rows with a fresh aggregation.
+
+    Returns one dict per (month, category) that differs; empty if consistent.
+    """
+    expected = compute_monthly_rollup()
+    stored = {(r.month, r.category): r.totals() for r in MonthlyRollup.query.all()}
+
+    mismatches = []
+    for key in sorted(set(expected) | set(stored)):
+        want = expected.get(key, (0.0, 0, 0, 0.0))
+        have = stored.get(key, (0.0, 0, 0, 0.0))
+        if any(abs((a or 0) - (b or 0)) > tolerance for a, b in zip(want, have)):
+            mismatches.append({"month": key[0], "category": key[1], "expected": want, "stored": have})
+    return mismatches
+
+
+MAX_PAGE_SIZE = 500
+
+
+def parse_date_arg(value: str, end: bool = False) -> datetime:
+    """Parse a YYYY-MM-DD or ISO datetime query arg; a bare end date covers that whole day."""
+    parsed = datetime.fromisoformat(value.strip().rstrip("Z"))
+    if end and len(value.strip()) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+
+def date_range_filters(args, date_column) -> list:
+    """
+    SQL conditions for the dateFrom/dateTo query args: a bare dateTo date
+    includes that whole day, a dateTo datetime is inclusive. Raises
+    ValueError on malformed values.
+    """
+    filters = []
+    if args.get("dateFrom"):
+        filters.append(date_column >= parse_date_arg(args["dateFrom"]))
+    if args.get("dateTo"):
+        date_to = args["dateTo"]
+        filters.append(date_column < parse_date_arg(date_to, end=True) if len(date_to.strip()) == 10
+                       else date_column <= parse_date_arg(date_to))
+    return filters
+
+
+def listing_filters(args, date_column) -> list:
+    """
+    SQL conditions for the category, vendor, status, dateFrom/dateTo and
+    minAmount/maxAmount query args shared by the expense and anomaly listings.
+    Raises ValueError on malformed values.
+    """
+    filters = []
+    if args.get("category"):
+        filters.append(Expense.category == args["category"])
+    if args.get("vendor"):
+        # Served by ix_expense_vendor_lower
+        filters.append(db.func.lower(Expense.vendor) == args["vendor"].strip().lower())
+    filters.extend(date_range_filters(args, date_column))
+    if args.get("minAmount"):
+        filters.append(Expense.amount >= float(args["minAmount"]))
+    if args.get("maxAmount"):
+        filters.append(Expense.amount <= float(args["maxAmount"]))
+    return filters
+
+
+def encode_cursor(timestamp: Optional[datetime], row_id: int) -> str:
+    # A NULL timestamp (legacy rows) is encoded as an empty string
+    raw = f"{timestamp.isoformat() if timestamp else ''}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """(timestamp or None, id) from encode_cursor(); ValueError if malformed."""
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+    timestamp, row_id = raw.rsplit("|", 1)
+    return (datetime.fromisoformat(timestamp) if timestamp else None), int(row_id)
+
+
+def keyset_page(query, timestamp_column, id_column, args) -> tuple:
+    """
+    Apply newest-first keyset pagination on (timestamp, id) to a query.
+
+    Without a `limit` arg every matching row is returned, as before. With
+    one, at most `limit` rows are returned. The `cursor` arg is the value
+    of encode_cursor() for the last row of the previous page.
+    Returns (rows, has_more); raises ValueError on a malformed limit or cursor.
+
+    Rows with a NULL timestamp are ordered where the (timestamp, id) index
+    already has them when read backwards: last on SQLite, first on Postgres.
+    """
+    nulls_first = db.engine.dialect.name == "postgresql"
+    timestamp_order = timestamp_column.desc().nulls_first() if nulls_first else timestamp_column.desc().nulls_last()
+    query = query.order_by(timestamp_order, id_column.desc())
+
+    if args.get("cursor"):
+        timestamp, row_id = decode_cursor(args["cursor"])
+        if timestamp is None:
+            after = db.and_(timestamp_column.is_(None), id_column < row_id)
+            if nulls_first:
+                after = db.or_(after, timestamp_column.isnot(None))
+        else:
+            after = db.or_(
+                timestamp_column < timestamp,
+                db.and_(timestamp_column == timestamp, id_column < row_id)
+            )
+            if not nulls_first:
+                after = db.or_(after, timestamp_column.is_(None))
+        query = query.filter(after)
+
+    raw_limit = args.get("limit")
+    if raw_limit is None or raw_limit == "":
+        return query.all(), False
     try:
-        all_expenses = Expense.query.all()
-        
-        if len(all_expenses) <= 1:
-            return anomalies
-        
-        similar_category_expenses = [e for e in all_expenses if e.category == category and e.id != expense_id]
+        limit = int(raw_limit)
+    except ValueError:
+        raise ValueError(f"limit must be an integer, got {raw_limit!r}")
+
+    limit = min(max(limit, 1), MAX_PAGE_SIZE)
+    rows = query.limit(limit + 1).all()
+    return rows[:limit], len(rows) > limit
+
+
+def sparse_fields(args, allowed) -> Optional[set]:
+    """The `fields` arg as a set of JSON keys (None for all); ValueError on unknown keys."""
+    if not args.get("fields"):
+        return None
+    fields = {f.strip() for f in args["fields"].split(",") if f.strip()}
+    unknown = fields - set(allowed)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return fields
+
+
+def pick_fields(record: Dict, fields: Optional[set]) -> Dict:
+    return record if fields is None else {k: v for k, v in record.items() if k in fields}
+
+
+def find_anomalies(expense_id: int, amount: float, vendor: str, category: str, uploaded_at,
+                   baseline: Dict = None, vendor_seen_before: int = None) -> list:
+    """
+    Build (unsaved) AnomalyDetection records for an expense.
+
+    `baseline` and `vendor_seen_before` are the values returned by
+    record_category_amount and record_vendor, i.e. the state from before this
+    expense was recorded. When not given they are read from CategoryStats and
+    Vendor as they currently stand.
+    """
+    anomalies = []
+
+    has_other_expenses = db.session.query(Expense.id).filter(Expense.id != expense_id).first() is not None
+
+    if not has_other_expenses:
+        return anomalies
+
+    if baseline is None:
+        stats = CategoryStats.query.get(category) if category else None
+        baseline = stats.snapshot() if stats else EMPTY_CATEGORY_STATS
+
+    if baseline["count"] > 0:
+        avg_amount = baseline["mean"]
+        max_amount = baseline["max"]
+        std_dev = baseline["std_dev"]
+
+        if std_dev > 0:
+            z_score = abs((amount - avg_amount) / std_dev)
+        else:
+            z_score = abs(amount - avg_amount) / (avg_amount + 1)
         
-        if similar_category_expenses:
-            amounts = [e.amount for e in similar_category_expenses if e.amount > 0]
-            
-            if amounts:
-                avg_amount = sum(amounts) / len(amounts)
-                max_amount = max(amounts)
-                min_amount = min(amounts)
-                std_dev = (sum((x - avg_amount) ** 2 for x in amounts) / len(amounts)) ** 0.5 if len(amounts) > 1 else 0
-                
-                if std_dev > 0:
-                    z_score = abs((amount - avg_amount) / std_dev)
-                else:
-                    z_score = abs(amount - avg_amount) / (avg_amount + 1)
-                
-                if z_score > 2:
-                    anomaly = AnomalyDetection(
-                        expense_id=expense_id,
-                        anomaly_type="Unusual Amount",
-                        severity="Critical" if z_score > 3 else "High" if z_score > 2.5 else "Medium",
-                        confidence=min(95, 50 + (z_score * 10)),
-                        description=f"Transaction amount ${amount:.2f} deviates significantly from category average ${avg_amount:.2f}",
-                        status="Pending"
-                    )
-                    anomalies.append(anomaly)
-                
-                if amount > (max_amount * 1.5):
-                    anomaly = AnomalyDetection(
-                        expense_id=expense_id,
-                        anomaly_type="Unusual Amount",
-                        severity="High",
-                        confidence=85,
-                        description=f"Transaction amount ${amount:.2f} exceeds typical spending pattern (max: ${max_amount:.2f})",
-                        status="Pending"
-                    )
-                    if not any(a.anomaly_type == "Unusual Amount" for a in anomalies):
-                        anomalies.append(anomaly)
-        
-        duplicate_expense = Expense.query.filter(
-            Expense.vendor == vendor,
-            Expense.amount == amount,
-            Expense.category == category,
-            Expense.id != expense_id,
-            Expense.uploaded_at >= (uploaded_at - db.func.cast(db.literal('1 day'), db.Interval))
-        ).first()
-        
-        if duplicate_expense:
+        if z_score > 2:
             anomaly = AnomalyDetection(
                 expense_id=expense_id,
-                anomaly_type="Duplicate Detection",
-                severity="High",
-                confidence=90,
-                description=f"Potential duplicate: Similar transaction found for {vendor} on {duplicate_expense.uploaded_at.strftime('%Y-%m-%d')}",
+                anomaly_type="Unusual Amount",
+                severity="Critical" if z_score > 3 else "High" if z_score > 2.5 else "Medium",
+                confidence=min(95, 50 + (z_score * 10)),
+                description=f"Transaction amount ${amount:.2f} deviates significantly from category average ${avg_amount:.2f}",
                 status="Pending"
             )
             anomalies.append(anomaly)
         
-        known_vendors = set(e.vendor.lower() for e in all_expenses if e.vendor)
-        if vendor.lower() not in known_vendors and len(known_vendors) > 0:
-            vendor_count = len([e for e in all_expenses if e.vendor.lower() == vendor.lower()])
-            
-            if vendor_count == 1:
-                anomaly = AnomalyDetection(
-                    expense_id=expense_id,
-                    anomaly_type="Unknown Vendor",
-                    severity="Low",
-                    confidence=70,
-                    description=f"Vendor '{vendor}' not found in previous transaction history",
-                    status="Pending"
-                )
+        if amount > (max_amount * 1.5):
+            anomaly = AnomalyDetection(
+                expense_id=expense_id,
+                anomaly_type="Unusual Amount",
+                severity="High",
+                confidence=85,
+                description=f"Transaction amount ${amount:.2f} exceeds typical spending pattern (max: ${max_amount:.2f})",
+                status="Pending"
+            )
+            if not any(a.anomaly_type == "Unusual Amount" for a in anomalies):
                 anomalies.append(anomaly)
+    
+    duplicate_expense = Expense.query.filter(
+        Expense.vendor == vendor,
+        Expense.amount == amount,
+        Expense.category == category,
+        Expense.uploaded_at >= uploaded_at - timedelta(days=1),
+        Expense.id != expense_id
+    ).first()
+    
+    if duplicate_expense:
+        anomaly = AnomalyDetection(
+            expense_id=expense_id,
+            anomaly_type="Duplicate Detection",
+            severity="High",
+            confidence=90,
+            description=f"Potential duplicate: Similar transaction found for {vendor} on {duplicate_expense.uploaded_at.strftime('%Y-%m-%d')}",
+            status="Pending"
+        )
+        anomalies.append(anomaly)
+    
+    normalized_vendor = normalize_vendor(vendor)
+    if normalized_vendor:
+        if vendor_seen_before is None:
+            vendor_row = Vendor.query.get(normalized_vendor)
+            vendor_seen_before = vendor_row.occurrence_count if vendor_row else 0
+
+        other_vendors_known = db.session.query(Vendor.normalized_name).filter(
+            Vendor.normalized_name != normalized_vendor
+        ).first() is not None
         
+        if vendor_seen_before == 0 and other_vendors_known:
+            anomaly = AnomalyDetection(
+                expense_id=expense_id,
+                anomaly_type="Unknown Vendor",
+                severity="Low",
+                confidence=70,
+                description=f"Vendor '{vendor}' not found in previous transaction history",
+                status="Pending"
+            )
+            anomalies.append(anomaly)
+    
+    return anomalies
+
+
+def anomaly_activity(anomaly: AnomalyDetection) -> ActivityLog:
+    return ActivityLog(
+        user="System",
+        action="Anomaly Detected",
+        action_type="flagged",
+        details=f"{anomaly.anomaly_type}: {anomaly.description}",
+        expense_id=anomaly.expense_id,
+        ip_address="system"
+    )
+
+
+def detect_anomalies(expense_id: int, amount: float, vendor: str, category: str, uploaded_at,
+                     baseline: Dict = None, vendor_seen_before: int = None) -> list:
+    """Detect anomalies in the expense and create AnomalyDetection records"""
+    anomalies = []
+
+    try:
+        anomalies = find_anomalies(expense_id, amount, vendor, category, uploaded_at,
+                                   baseline=baseline, vendor_seen_before=vendor_seen_before)
+
         for anomaly in anomalies:
             db.session.add(anomaly)
         
         if anomalies:
-            db.session.commit()
-            
+            record_monthly_rollup(uploaded_at, category, amount, flagged=True)
             for anomaly in anomalies:
-                activity = ActivityLog(
-                    user="System",
-                    action="Anomaly Detected",
-                    action_type="flagged",
-                    details=f"{anomaly.anomaly_type}: {anomaly.description}",
-                    expense_id=expense_id,
-                    ip_address="system"
-                )
-                db.session.add(activity)
+                record_activity(anomaly_activity(anomaly))
             db.session.commit()
     
     except Exception as e:
@@ -485,6 +1235,52 @@ def home():
     return jsonify({"status": "success", "message": "Transparency-AI backend running"})
 
 
+def process_receipt(filepath: str, filename: str, user: str, ip_address: str) -> Dict:
+    """Run OCR, classification and anomaly detection for one saved receipt file (image or PDF)."""
+    text = extract_text(filepath)
+    category, category_score = classify_text_with_score(text)
+    entities = extract_entities(text)
+
+    expense = Expense(
+        filename=filename,
+        uploaded_at=datetime.utcnow(),
+        category=category,
+        vendor=entities["vendor"],
+        amount=entities["total"],
+        text_preview=text[:200],
+        status="Processed" if text else "Needs Review"
+    )
+
+    db.session.add(expense)
+    category_baseline = record_category_amount(category, entities["total"])
+    vendor_seen_before = record_vendor(entities["vendor"])
+    record_monthly_rollup(expense.uploaded_at, category, entities["total"], expenses=1)
+    db.session.flush()
+
+    # The upload entry commits together with the expense it describes
+    record_activity(ActivityLog(
+        user=user,
+        action="Uploaded Receipt",
+        action_type="uploaded",
+        details=f"{entities['vendor']} - ${entities['total']}",
+        expense_id=expense.id,
+        ip_address=ip_address
+    ), durable=True)
+    db.session.commit()
+
+    detect_anomalies(expense.id, entities["total"], entities["vendor"], category, expense.uploaded_at,
+                     baseline=category_baseline, vendor_seen_before=vendor_seen_before)
+
+    recent_uploads.appendleft(expense.to_dict())
+
+    return {
+        "success": True,
+        "text": text,
+        "classification": {"label": category, "score": category_score},
+        "entities": entities
+    }
+
+
 @app.route("/ocr", methods=["POST"])
 def ocr():
     if "file" not in request.files:
@@ -495,55 +1291,238 @@ def ocr():
     if file.filename == "":
         return jsonify({"error": "No selected file"}), 400
 
+    user = request.headers.get('X-User-Name', 'Unknown User')
+
+    if OCR_MODE == "queue":
+        # Unique name so queued files can't overwrite each other before a worker picks them up
+        filepath = os.path.join(UPLOAD_FOLDER, f"{uuid4()}_{secure_filename(file.filename)}")
+        file.save(filepath)
+
+        job_id = get_ocr_job_queue().enqueue({
+            "filepath": filepath,
+            "filename": file.filename,
+            "user": user,
+            "ip_address": request.remote_addr
+        })
+        return jsonify({
+            "success": True,
+            "jobId": job_id,
+            "status": "queued",
+            "statusUrl": f"/ocr/jobs/{job_id}"
+        }), 202
+
     filepath = os.path.join(UPLOAD_FOLDER, file.filename)
     file.save(filepath)
 
     try:
-        text = extract_text_from_image(filepath)
-        category = classify_text(text)
-        entities = extract_entities(text)
+        result = process_receipt(filepath, file.filename, user, request.remote_addr)
 
-        expense = Expense(
-            filename=file.filename,
-            category=category,
-            vendor=entities["vendor"],
-            amount=entities["total"],
-            text_preview=text[:200],
-            status="Processed" if text else "Needs Review"
-        )
+        os.remove(filepath)
 
-        db.session.add(expense)
-        db.session.commit()
+        return jsonify(result)
 
-        activity = ActivityLog(
-            user=request.headers.get('X-User-Name', 'Unknown User'),
-            action="Uploaded Receipt",
-            action_type="uploaded",
-            details=f"{entities['vendor']} - ${entities['total']}",
-            expense_id=expense.id,
-            ip_address=request.remote_addr
-        )
-        db.session.add(activity)
-        db.session.commit()
+    except Exception as error:
+        db.session.rollback()
+        if os.path.exists(filepath):
+            os.remove(filepath)
+        return jsonify({"error": str(error)}), 500
 
-        detect_anomalies(expense.id, entities["total"], entities["vendor"], category, expense.uploaded_at)
 
-        recent_uploads.appendleft(expense.to_dict())
+@app.route("/ocr/jobs/<job_id>", methods=["GET"])
+def get_ocr_job(job_id):
+    job = get_ocr_job_queue().get(job_id)
+
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+
+    def _iso(ts):
+        return datetime.utcfromtimestamp(ts).isoformat() + "Z" if ts else None
+
+    return jsonify({
+        "success": True,
+        "job": {
+            "id": job["id"],
+            "status": job["status"],
+            "filename": job["payload"].get("filename"),
+            "attempts": job["attempts"],
+            "createdAt": _iso(job["created_at"]),
+            "startedAt": _iso(job["started_at"]),
+            "finishedAt": _iso(job["finished_at"]),
+            "result": job["result"],
+            "error": job["error"]
+        }
+    })
+
+
+@app.route("/ocr/cache/stats", methods=["GET"])
+def get_ocr_cache_stats():
+    cache = get_ocr_cache()
+    if cache is None:
+        return jsonify({"success": True, "enabled": False})
+    return jsonify({"success": True, "enabled": True, **cache.stats()})
+
+
+@app.route("/ocr/timings", methods=["GET"])
+def get_ocr_stage_timings():
+    return jsonify({"success": True, "stages": get_ocr_timings()})
+
+
+@app.route("/models/status", methods=["GET"])
+def get_models_status():
+    return jsonify({"success": True, "models": model_registry.status()})
 
-        os.remove(filepath)
+
+def _collect_batch_files(saved: list):
+    """
+    Save the receipts of a batch upload (a zip under "archive" and/or a
+    multipart list under "files"), appending (original_name, saved_path)
+    pairs to `saved` as they are written.
+
+    Raises ValueError when the batch has more than MAX_BATCH_FILES receipts
+    or a zip exceeds MAX_BATCH_FILE_BYTES per member or MAX_BATCH_BYTES in
+    total, and zipfile.BadZipFile for a corrupt archive.
+    """
+    too_many = f"Too many files (max {MAX_BATCH_FILES})"
+
+    for file in request.files.getlist("files"):
+        if not file.filename:
+            continue
+        if len(saved) >= MAX_BATCH_FILES:
+            raise ValueError(too_many)
+        filepath = os.path.join(UPLOAD_FOLDER, f"{uuid4()}_{secure_filename(file.filename)}")
+        file.save(filepath)
+        saved.append((file.filename, filepath))
+
+    archive = request.files.get("archive")
+    if archive and archive.filename:
+        with zipfile.ZipFile(archive.stream) as zf:
+            members = [m for m in zf.infolist()
+                       if not m.is_dir() and allowed_receipt(os.path.basename(m.filename))]
+
+            # Check the declared sizes up front (zipfile never reads past
+            # them) so an oversized archive is rejected before extraction
+            if len(saved) + len(members) > MAX_BATCH_FILES:
+                raise ValueError(too_many)
+            for member in members:
+                if member.file_size > MAX_BATCH_FILE_BYTES:
+                    raise ValueError(f"{os.path.basename(member.filename)} is too large when uncompressed "
+                                     f"(max {MAX_BATCH_FILE_BYTES} bytes)")
+            if sum(member.file_size for member in members) > MAX_BATCH_BYTES:
+                raise ValueError(f"Archive is too large when uncompressed (max {MAX_BATCH_BYTES} bytes)")
+
+            for member in members:
+                name = os.path.basename(member.filename)
+                filepath = os.path.join(UPLOAD_FOLDER, f"{uuid4()}_{secure_filename(name)}")
+                with zf.open(member) as src, open(filepath, "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                saved.append((name, filepath))
+
+
+@app.route("/ocr/batch", methods=["POST"])
+def ocr_batch():
+    """
+    OCR many receipts in one request: images are fanned out across the OCR
+    process pool, classified together, stored in a single transaction and
+    checked for anomalies once for the whole batch.
+    """
+    saved = []
+    try:
+        _collect_batch_files(saved)
+    except (zipfile.BadZipFile, ValueError) as error:
+        for _, filepath in saved:
+            os.remove(filepath)
+        message = "Invalid zip archive" if isinstance(error, zipfile.BadZipFile) else str(error)
+        return jsonify({"error": message}), 400
+
+    if not saved:
+        return jsonify({"error": "No files uploaded"}), 400
+
+    user = request.headers.get('X-User-Name', 'Unknown User')
+
+    try:
+        texts = extract_texts_from_images([path for _, path in saved], max_workers=OCR_BATCH_WORKERS)
+
+        results = [None] * len(saved)
+        ok = [i for i, text in enumerate(texts) if not isinstance(text, Exception)]
+        for i, text in enumerate(texts):
+            if isinstance(text, Exception):
+                results[i] = {"file": saved[i][0], "success": False, "error": str(text)}
+
+        classifications = classify_texts_with_scores([texts[i] for i in ok])
+
+        pending = []
+        for i, (category, category_score) in zip(ok, classifications):
+            text = texts[i]
+            entities = extract_entities(text)
+            expense = Expense(
+                filename=saved[i][0],
+                uploaded_at=datetime.utcnow(),
+                category=category,
+                vendor=entities["vendor"],
+                amount=entities["total"],
+                text_preview=text[:200],
+                status="Processed" if text else "Needs Review"
+            )
+            db.session.add(expense)
+            baseline = record_category_amount(category, entities["total"])
+            vendor_seen_before = record_vendor(entities["vendor"])
+            record_monthly_rollup(expense.uploaded_at, category, entities["total"], expenses=1)
+            pending.append((i, expense, entities, category_score, baseline, vendor_seen_before))
+
+        db.session.flush()
+
+        all_anomalies = []
+        for i, expense, entities, category_score, baseline, vendor_seen_before in pending:
+            record_activity(ActivityLog(
+                user=user,
+                action="Uploaded Receipt",
+                action_type="uploaded",
+                details=f"{entities['vendor']} - ${entities['total']}",
+                expense_id=expense.id,
+                ip_address=request.remote_addr
+            ), durable=True)
+
+            anomalies = find_anomalies(expense.id, entities["total"], entities["vendor"], expense.category,
+                                       expense.uploaded_at, baseline=baseline, vendor_seen_before=vendor_seen_before)
+            all_anomalies.extend(anomalies)
+            if anomalies:
+                record_monthly_rollup(expense.uploaded_at, expense.category, entities["total"], flagged=True)
+
+            results[i] = {
+                "file": saved[i][0],
+                "success": True,
+                "expenseId": expense.id,
+                "text": texts[i],
+                "classification": {"label": expense.category, "score": category_score},
+                "entities": entities,
+                "anomalies": [a.anomaly_type for a in anomalies]
+            }
+
+        db.session.add_all(all_anomalies)
+        for anomaly in all_anomalies:
+            record_activity(anomaly_activity(anomaly))
+        db.session.commit()
+
+        for _, expense, _, _, _, _ in pending:
+            recent_uploads.appendleft(expense.to_dict())
 
         return jsonify({
             "success": True,
-            "text": text,
-            "classification": {"label": category, "score": 0.0},
-            "entities": entities
+            "processed": len(pending),
+            "failed": len(saved) - len(pending),
+            "anomaliesDetected": len(all_anomalies),
+            "results": results
         })
 
     except Exception as error:
-        if os.path.exists(filepath):
-            os.remove(filepath)
+        db.session.rollback()
         return jsonify({"error": str(error)}), 500
 
+    finally:
+        for _, filepath in saved:
+            if os.path.exists(filepath):
+                os.remove(filepath)
+
 
 # ----------------
 # Authentication Routes
@@ -635,13 +1614,13 @@ def analyze():
     text = data["text"]
 
     try:
-        category = classify_text(text)
+        category, category_score = classify_text_with_score(text)
         entities = extract_entities(text)
 
         return jsonify({
             "success": True,
             "text": text,
-            "classification": {"label": category, "score": 0.0},
+            "classification": {"label": category, "score": category_score},
             "entities": entities,
             "length": len(text)
         })
@@ -655,34 +1634,49 @@ def recent_uploads_api():
     return jsonify({"success": True, "uploads": list(recent_uploads)})
 
 
+EXPENSE_FIELDS = ("id", "file", "uploadedAt", "category", "vendor", "total", "textPreview", "status")
+ANOMALY_FIELDS = ("id", "expenseId", "dateTime", "vendorName", "category", "amount", "anomalyType",
+                  "severity", "confidence", "description", "detectedAt", "status")
+
+
+def filtered_expenses(query, args):
+    query = query.filter(*listing_filters(args, Expense.uploaded_at))
+    if args.get("status"):
+        query = query.filter(Expense.status == args["status"])
+    return query
+
+
+def list_expenses(query, args) -> Dict:
+    """Filter, page and serialize an Expense query for the listing endpoints."""
+    fields = sparse_fields(args, EXPENSE_FIELDS)
+
+    query = filtered_expenses(query, args)
+    expenses, has_more = keyset_page(query, Expense.uploaded_at, Expense.id, args)
+    return {
+        "success": True,
+        "expenses": [pick_fields(e.to_dict(), fields) for e in expenses],
+        "count": len(expenses),
+        "nextCursor": encode_cursor(expenses[-1].uploaded_at, expenses[-1].id) if has_more else None
+    }
+
+
 @app.route("/expenses", methods=["GET"])
 def get_expenses():
-    expenses = Expense.query.all()
-    return jsonify({
-        "success": True,
-        "expenses": [e.to_dict() for e in expenses],
-        "count": len(expenses)
-    })
+    try:
+        return jsonify(list_expenses(Expense.query, request.args))
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query parameter: {str(e)}"}), 400
+    except Exception as e:
+        return jsonify({"error": f"Failed to get expenses: {str(e)}"}), 500
 
 
 @app.route("/expenses/non-anomalous", methods=["GET"])
 def get_non_anomalous_expenses():
     try:
-        expenses = Expense.query.all()
-        anomalies = AnomalyDetection.query.all()
-        
-        anomalous_expense_ids = set(a.expense_id for a in anomalies)
-        
-        non_anomalous = [
-            e.to_dict() for e in expenses 
-            if e.id not in anomalous_expense_ids
-        ]
-        
-        return jsonify({
-            "success": True,
-            "expenses": non_anomalous,
-            "count": len(non_anomalous)
-        })
+        has_anomaly = db.exists().where(AnomalyDetection.expense_id == Expense.id)
+        return jsonify(list_expenses(Expense.query.filter(~has_anomaly), request.args))
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query parameter: {str(e)}"}), 400
     except Exception as e:
         return jsonify({"error": f"Failed to get non-anomalous expenses: {str(e)}"}), 500
 
@@ -690,19 +1684,17 @@ def get_non_anomalous_expenses():
 @app.route("/expenses/stats", methods=["GET"])
 def get_expenses_stats():
     try:
-        expenses = Expense.query.all()
-
-        # Calculate total stats
-        total_expenses = len(expenses)
-        total_amount = sum(expense.amount for expense in expenses)
+        total_expenses, total_amount = db.session.query(
+            db.func.count(Expense.id),
+            db.func.coalesce(db.func.sum(Expense.amount), 0)
+        ).one()
 
         # Calculate by category
-        by_category = {}
-        for expense in expenses:
-            category = expense.category
-            if category not in by_category:
-                by_category[category] = 0
-            by_category[category] += expense.amount
+        by_category = dict(
+            db.session.query(Expense.category, db.func.sum(Expense.amount))
+            .group_by(Expense.category)
+            .all()
+        )
 
         # Calculate category percentages
         category_percentages = {}
@@ -729,22 +1721,24 @@ def get_expenses_stats():
 @app.route("/expenses/by-category", methods=["GET"])
 def get_expenses_by_category():
     try:
-        expenses = Expense.query.all()
-
-        # Group expenses by category
-        categories = {}
-        for expense in expenses:
-            category = expense.category
-            if category not in categories:
-                categories[category] = {
-                    "total": 0,
-                    "count": 0,
-                    "expenses": []
-                }
+        totals = db.session.query(
+            Expense.category,
+            db.func.coalesce(db.func.sum(Expense.amount), 0),
+            db.func.count(Expense.id)
+        ).group_by(Expense.category)
+
+        categories = {
+            category: {"total": total, "count": count, "expenses": []}
+            for category, total, count in totals
+        }
 
-            categories[category]["total"] += expense.amount
-            categories[category]["count"] += 1
-            categories[category]["expenses"].append(expense.to_dict())
+        # Plain column rows, streamed in batches: no ORM instances are built
+        rows = db.session.execute(
+            db.select(*Expense.__table__.columns).order_by(Expense.id).execution_options(yield_per=1000)
+        )
+        for row in rows:
+            group = categories.setdefault(row.category, {"total": 0, "count": 0, "expenses": []})
+            group["expenses"].append(Expense.row_to_dict(row))
 
         return jsonify({
             "success": True,
@@ -761,15 +1755,13 @@ def get_monthly_trends():
         from collections import defaultdict
         from datetime import datetime
 
-        expenses = Expense.query.all()
+        rows = db.session.query(MonthlyRollup.month, MonthlyRollup.category, MonthlyRollup.total_amount) \
+            .filter(MonthlyRollup.expense_count > 0)
 
         # Group expenses by month and category
         monthly_data = defaultdict(lambda: defaultdict(float))
-
-        for expense in expenses:
-            # Extract month-year from uploaded_at
-            month_year = expense.uploaded_at.strftime("%Y-%m") if expense.uploaded_at else "2024-11"
-            monthly_data[month_year][expense.category] += expense.amount
+        for month_year, category, amount in rows:
+            monthly_data[month_year][category] += amount
 
         # Convert to list format for frontend
         trends_data = []
@@ -801,15 +1793,36 @@ def get_monthly_trends():
 # ------------------------
 # Anomaly Detection
 # ------------------------
+def filtered_anomalies(args):
+    """AnomalyDetection query (with its expense joined in) narrowed by the listing query args."""
+    query = AnomalyDetection.query \
+        .outerjoin(Expense, Expense.id == AnomalyDetection.expense_id) \
+        .options(db.contains_eager(AnomalyDetection.expense)) \
+        .filter(*listing_filters(args, AnomalyDetection.detected_at))
+    if args.get("status"):
+        query = query.filter(AnomalyDetection.status == args["status"])
+    if args.get("severity"):
+        query = query.filter(AnomalyDetection.severity == args["severity"])
+    if args.get("anomalyType"):
+        query = query.filter(AnomalyDetection.anomaly_type == args["anomalyType"])
+    return query
+
+
 @app.route("/anomalies", methods=["GET"])
 def get_anomalies():
     try:
-        anomalies = AnomalyDetection.query.all()
+        args = request.args
+        fields = sparse_fields(args, ANOMALY_FIELDS)
+        query = filtered_anomalies(args)
+        anomalies, has_more = keyset_page(query, AnomalyDetection.detected_at, AnomalyDetection.id, args)
         return jsonify({
             "success": True,
-            "anomalies": [a.to_dict() for a in anomalies],
-            "count": len(anomalies)
+            "anomalies": [pick_fields(a.to_dict(), fields) for a in anomalies],
+            "count": len(anomalies),
+            "nextCursor": encode_cursor(anomalies[-1].detected_at, anomalies[-1].id) if has_more else None
         })
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query parameter: {str(e)}"}), 400
     except Exception as e:
         return jsonify({"error": f"Failed to get anomalies: {str(e)}"}), 500
 
@@ -817,25 +1830,30 @@ def get_anomalies():
 @app.route("/anomalies/stats", methods=["GET"])
 def get_anomalies_stats():
     try:
-        anomalies = AnomalyDetection.query.all()
-        
-        total_anomalies = len(anomalies)
+        total_anomalies, avg_confidence, flagged_count = db.session.query(
+            db.func.count(AnomalyDetection.id),
+            db.func.coalesce(db.func.avg(AnomalyDetection.confidence), 0),
+            db.func.count(db.distinct(AnomalyDetection.expense_id))
+        ).one()
+
         severity_counts = {"Critical": 0, "High": 0, "Medium": 0, "Low": 0}
-        anomaly_types = {}
-        
-        for anomaly in anomalies:
-            severity_counts[anomaly.severity] = severity_counts.get(anomaly.severity, 0) + 1
-            atype = anomaly.anomaly_type
-            anomaly_types[atype] = anomaly_types.get(atype, 0) + 1
-        
-        avg_confidence = sum(a.confidence for a in anomalies) / len(anomalies) if anomalies else 0
-        
-        expenses = Expense.query.all()
-        flagged_count = len(set(a.expense_id for a in anomalies))
-        
+        severity_counts.update(
+            db.session.query(AnomalyDetection.severity, db.func.count(AnomalyDetection.id))
+            .group_by(AnomalyDetection.severity)
+            .all()
+        )
+
+        anomaly_types = dict(
+            db.session.query(AnomalyDetection.anomaly_type, db.func.count(AnomalyDetection.id))
+            .group_by(AnomalyDetection.anomaly_type)
+            .all()
+        )
+
+        total_charges = db.session.query(db.func.coalesce(db.func.sum(Expense.amount), 0)).scalar()
+
         return jsonify({
             "success": True,
-            "totalCharges": sum(e.amount for e in expenses),
+            "totalCharges": total_charges,
             "anomalousTransactions": total_anomalies,
             "flaggedExpenses": flagged_count,
             "detectionAccuracy": min(100, 70 + (avg_confidence * 0.3)),
@@ -850,14 +1868,14 @@ def get_anomalies_stats():
 @app.route("/anomalies/by-severity", methods=["GET"])
 def get_anomalies_by_severity():
     try:
-        anomalies = AnomalyDetection.query.all()
         by_severity = {"Critical": [], "High": [], "Medium": [], "Low": []}
-        
+
+        anomalies = AnomalyDetection.query \
+            .filter(AnomalyDetection.severity.in_(list(by_severity))) \
+            .order_by(AnomalyDetection.id)
         for anomaly in anomalies:
-            severity = anomaly.severity
-            if severity in by_severity:
-                by_severity[severity].append(anomaly.to_dict())
-        
+            by_severity[anomaly.severity].append(anomaly.to_dict())
+
         return jsonify({
             "success": True,
             "by_severity": by_severity
@@ -887,8 +1905,8 @@ def get_recent_anomalies():
 @app.route("/api/categories", methods=["GET"])
 def get_categories():
     try:
-        expenses = Expense.query.all()
-        categories = sorted(set(e.category for e in expenses if e.category))
+        rows = db.session.query(Expense.category).filter(Expense.category.isnot(None), Expense.category != "").distinct()
+        categories = sorted(category for (category,) in rows)
         return jsonify({
             "success": True,
             "categories": categories
@@ -994,13 +2012,9 @@ def get_admin_reports():
 @app.route("/api/auditor/reports", methods=["GET"])
 def get_auditor_reports():
     try:
-        from collections import defaultdict
-        
         category_filter = request.args.get("category", None)
         date_range = request.args.get("dateRange", "All Time")
         
-        expenses = Expense.query.all()
-        
         date_cutoff = None
         if date_range == "Last 3 Months":
             date_cutoff = datetime.utcnow() - timedelta(days=90)
@@ -1009,63 +2023,86 @@ def get_auditor_reports():
         elif date_range == "Last Year":
             date_cutoff = datetime.utcnow() - timedelta(days=365)
         
+        expense_filters = []
+        anomaly_filters = []
         if date_cutoff:
-            expenses = [e for e in expenses if e.uploaded_at and e.uploaded_at >= date_cutoff]
+            expense_filters.append(Expense.uploaded_at >= date_cutoff)
+            anomaly_filters.append(AnomalyDetection.detected_at >= date_cutoff)
         
         if category_filter and category_filter != "All Categories":
-            expenses = [e for e in expenses if e.category == category_filter]
+            expense_filters.append(Expense.category == category_filter)
         
-        anomalies = AnomalyDetection.query.all()
-        
-        if date_cutoff:
-            anomalies = [a for a in anomalies if a.detected_at and a.detected_at >= date_cutoff]
+        total_transactions, total_amount = db.session.query(
+            db.func.count(Expense.id),
+            db.func.coalesce(db.func.sum(Expense.amount), 0)
+        ).filter(*expense_filters).one()
         
-        total_transactions = len(expenses)
-        total_amount = sum(e.amount for e in expenses) if expenses else 0
-        
-        by_category = defaultdict(float)
-        for expense in expenses:
-            by_category[expense.category] += expense.amount
+        by_category = db.session.query(Expense.category, db.func.sum(Expense.amount)) \
+            .filter(*expense_filters) \
+            .group_by(Expense.category)
         
         category_spending_data = [
-            {"category": cat, "amount": round(amt, 2)} 
-            for cat, amt in sorted(by_category.items(), key=lambda x: x[1], reverse=True)
+            {"category": cat, "amount": round(amt or 0, 2)} 
+            for cat, amt in sorted(by_category, key=lambda x: x[1] or 0, reverse=True)
         ]
         
-        monthly_data = defaultdict(lambda: defaultdict(float))
-        
-        for expense in expenses:
-            month_year = expense.uploaded_at.strftime("%Y-%m") if expense.uploaded_at else "2024-11"
-            monthly_data[month_year][expense.category] += expense.amount
+        if date_cutoff:
+            # The cutoff falls mid-month, so this needs the expense rows themselves
+            month = db.func.coalesce(month_bucket(Expense.uploaded_at), "2024-11")
+            monthly_data = db.session.query(month, db.func.sum(Expense.amount)) \
+                .filter(*expense_filters) \
+                .group_by(month)
+        else:
+            monthly_data = db.session.query(MonthlyRollup.month, db.func.sum(MonthlyRollup.total_amount)) \
+                .filter(MonthlyRollup.expense_count > 0)
+            if category_filter and category_filter != "All Categories":
+                monthly_data = monthly_data.filter(MonthlyRollup.category == category_filter)
+            monthly_data = monthly_data.group_by(MonthlyRollup.month)
         
         expense_trend_data = []
-        for month_year in sorted(monthly_data.keys()):
+        for month_year, amount in sorted(monthly_data):
             month_name = datetime.strptime(month_year, "%Y-%m").strftime("%b %y")
-            amount = sum(monthly_data[month_year].values())
-            expense_trend_data.append({"month": month_name, "amount": round(amount, 2)})
+            expense_trend_data.append({"month": month_name, "amount": round(amount or 0, 2)})
         
         average_per_transaction = (total_amount / total_transactions) if total_transactions > 0 else 0
         
-        anomalous_expense_ids = set(a.expense_id for a in anomalies)
-        flagged_items = len(anomalous_expense_ids)
+        # Anomalies in the date range whose expense also matches the filters,
+        # so flaggedItems is a subset of totalTransactions. With a dateRange
+        # this leaves out anomalies detected in the range on expenses
+        # uploaded before it, which flaggedItems used to count
+        flagged_anomalies = AnomalyDetection.query \
+            .join(Expense, Expense.id == AnomalyDetection.expense_id) \
+            .filter(*expense_filters, *anomaly_filters)
+        
+        flagged_items = flagged_anomalies.with_entities(
+            db.func.count(db.distinct(AnomalyDetection.expense_id))
+        ).scalar()
         
         compliance_rate = ((total_transactions - flagged_items) / total_transactions * 100) if total_transactions > 0 else 100
         compliance_rate = round(min(100, max(0, compliance_rate)), 1)
         
-        flagged_amount = sum(e.amount for e in expenses if e.id in anomalous_expense_ids)
+        flagged_expense_ids = db.select(AnomalyDetection.expense_id).where(*anomaly_filters)
+        flagged_amount = db.session.query(db.func.coalesce(db.func.sum(Expense.amount), 0)) \
+            .filter(*expense_filters, Expense.id.in_(flagged_expense_ids)) \
+            .scalar()
         
-        anomaly_types = defaultdict(int)
-        severity_counts = defaultdict(int)
-        for anomaly in anomalies:
-            if anomaly.expense_id in [e.id for e in expenses]:
-                anomaly_types[anomaly.anomaly_type] += 1
-                severity_counts[anomaly.severity] += 1
+        anomaly_types = flagged_anomalies.with_entities(
+            AnomalyDetection.anomaly_type, db.func.count(AnomalyDetection.id)
+        ).group_by(AnomalyDetection.anomaly_type).order_by(db.func.min(AnomalyDetection.id))
         
         fraud_detection_data = [
             {"category": atype, "count": count, "fill": "#ff6b6b" if count > 0 else "#cccccc"} 
-            for atype, count in anomaly_types.items()
+            for atype, count in anomaly_types
         ]
         
+        flagged_limit = min(max(request.args.get("limit", 50, type=int), 0), 500)
+        flagged_offset = max(request.args.get("offset", 0, type=int), 0)
+        flagged_total = flagged_anomalies.order_by(None).count()
+        flagged_page = flagged_anomalies \
+            .options(db.contains_eager(AnomalyDetection.expense)) \
+            .order_by(AnomalyDetection.detected_at.desc(), AnomalyDetection.id.desc()) \
+            .limit(flagged_limit).offset(flagged_offset).all()
+        
         if not fraud_detection_data:
             fraud_detection_data = [
                 {"category": "Duplicates", "count": 0, "fill": "#cccccc"},
@@ -1170,6 +2207,12 @@ def get_auditor_reports():
             "expenseTrendData": expense_trend_data,
             "categorySpendingData": category_spending_data,
             "fraudDetectionData": fraud_detection_data,
+            "flaggedTransactions": {
+                "items": [a.to_dict() for a in flagged_page],
+                "total": flagged_total,
+                "limit": flagged_limit,
+                "offset": flagged_offset
+            },
             "aiInsights": ai_insights
         })
     except Exception as e:
@@ -1455,6 +2498,7 @@ def update_settings(role):
 # AI Insights
 # ------------------------
 @app.route("/api/admin/ai-insights", methods=["GET"])
+@cached_response
 def get_ai_insights():
     try:
         expenses = Expense.query.all()
@@ -1577,6 +2621,7 @@ def get_ai_insights():
 
 
 @app.route("/api/auditor/ai-insights", methods=["GET"])
+@cached_response
 def get_auditor_ai_insights():
     try:
         expenses = Expense.query.all()
@@ -1780,31 +2825,111 @@ def upload_logo(role):
 # DB Migration
 # ------------------------
 def migrate_database():
-    try:
-        from sqlalchemy import inspect, text
-        inspector = inspect(db.engine)
-        cols = [c["name"] for c in inspector.get_columns("user_settings")]
+    """Bring the schema up to date; a single version lookup when it already is."""
+    for version, description in run_migrations(db.engine, db.metadata):
+        print(f"[DB] Applied migration {version}: {description}")
 
-        needed = False
 
-        if "logo_path" not in cols:
-            db.session.execute(text("ALTER TABLE user_settings ADD COLUMN logo_path VARCHAR(255)"))
-            needed = True
+# ------------------------
+# Streaming Exports
+# ------------------------
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+EXPORT_CHUNK_BYTES = 64 * 1024
+ACTIVITY_FIELDS = ("id", "timestamp", "user", "action", "actionType", "details", "expenseId", "ipAddress")
+
+
+def stream_export(name: str, query, allowed_fields, args) -> Response:
+    """
+    Stream every row of `query` as NDJSON (default) or CSV, optionally gzipped.
+
+    Rows are read through a server-side cursor EXPORT_BATCH_SIZE at a time
+    and written out in ~64KB chunks, so memory use does not depend on the
+    number of rows exported.
+    """
+    fmt = args.get("format", "ndjson").lower()
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}")
+    fields = sparse_fields(args, allowed_fields)
+    columns = [f for f in allowed_fields if fields is None or f in fields]
+    compress = args.get("gzip", "false").lower() in ("1", "true", "yes")
+
+    def encode():
+        buffer = io.StringIO()
+        writer = None
+        if fmt == "csv":
+            writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+            writer.writeheader()
+
+        for row in query.yield_per(EXPORT_BATCH_SIZE):
+            record = pick_fields(row.to_dict(), fields)
+            if writer:
+                writer.writerow(record)
+            else:
+                buffer.write(json.dumps(record) + "\n")
+
+            if buffer.tell() >= EXPORT_CHUNK_BYTES:
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+
+        yield buffer.getvalue().encode("utf-8")
+
+    def body():
+        if not compress:
+            yield from encode()
+            return
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip container
+        for chunk in encode():
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+
+    filename = f"{name}-{datetime.utcnow():%Y%m%d}.{fmt}" + (".gz" if compress else "")
+    return Response(
+        stream_with_context(body()),
+        mimetype="application/gzip" if compress else EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
+@app.route("/export/expenses", methods=["GET"])
+def export_expenses():
+    try:
+        query = filtered_expenses(Expense.query, request.args).order_by(Expense.id)
+        return stream_export("expenses", query, EXPENSE_FIELDS, request.args)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query parameter: {str(e)}"}), 400
+    except Exception as e:
+        return jsonify({"error": f"Failed to export expenses: {str(e)}"}), 500
 
-        if "contact_info" not in cols:
-            db.session.execute(text("ALTER TABLE user_settings ADD COLUMN contact_info TEXT"))
-            needed = True
 
-        if "help_content" not in cols:
-            db.session.execute(text("ALTER TABLE user_settings ADD COLUMN help_content TEXT"))
-            needed = True
+@app.route("/export/anomalies", methods=["GET"])
+def export_anomalies():
+    try:
+        query = filtered_anomalies(request.args).order_by(AnomalyDetection.id)
+        return stream_export("anomalies", query, ANOMALY_FIELDS, request.args)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query parameter: {str(e)}"}), 400
+    except Exception as e:
+        return jsonify({"error": f"Failed to export anomalies: {str(e)}"}), 500
 
-        if needed:
-            db.session.commit()
 
+@app.route("/export/activity-logs", methods=["GET"])
+def export_activity_logs():
+    try:
+        args = request.args
+        query = ActivityLog.query.filter(*date_range_filters(args, ActivityLog.timestamp))
+        if args.get("actionType"):
+            query = query.filter(ActivityLog.action_type == args["actionType"])
+        if args.get("user"):
+            query = query.filter(ActivityLog.user == args["user"])
+        return stream_export("activity-logs", query.order_by(ActivityLog.id), ACTIVITY_FIELDS, args)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query parameter: {str(e)}"}), 400
     except Exception as e:
-        print("Migration skipped:", e)
-        db.session.rollback()
+        return jsonify({"error": f"Failed to export activity logs: {str(e)}"}), 500
 
 
 # ------------------------
@@ -1829,45 +2954,72 @@ def get_activity_logs():
         return jsonify({"error": f"Failed to get activity logs: {str(e)}"}), 500
 
 
+def activity_histogram(since: datetime, granularity: str, buckets: int) -> list:
+    """ActivityLog counts per hour or day from `since` on, with empty buckets filled in."""
+    bucket = time_bucket(ActivityLog.timestamp, granularity)
+    counts = dict(
+        db.session.query(bucket, db.func.count(ActivityLog.id))
+        .filter(ActivityLog.timestamp >= since)
+        .group_by(bucket)
+        .all()
+    )
+
+    label_format = TIME_BUCKET_FORMATS[granularity][2]
+    step = timedelta(hours=1) if granularity == "hour" else timedelta(days=1)
+    labels = [(since + step * i).strftime(label_format) for i in range(buckets)]
+    return [{"bucket": label, "count": counts.get(label, 0)} for label in labels]
+
+
 @app.route("/activity-logs/stats", methods=["GET"])
 def get_activity_stats():
     try:
+        hours = min(max(request.args.get('hours', 24, type=int), 1), 24 * 14)
+        days = min(max(request.args.get('days', 30, type=int), 1), 366)
+
         now = datetime.utcnow()
         thirty_days_ago = now - timedelta(days=30)
         seven_days_ago = now - timedelta(days=7)
-        
-        all_activities = ActivityLog.query.all()
-        activities_30d = ActivityLog.query.filter(ActivityLog.timestamp >= thirty_days_ago).all()
-        activities_7d = ActivityLog.query.filter(ActivityLog.timestamp >= seven_days_ago).all()
-        
-        action_counts = {}
-        for activity in all_activities:
-            action = activity.action
-            action_counts[action] = action_counts.get(action, 0) + 1
-        
-        action_type_counts = {}
-        for activity in activities_30d:
-            action_type = activity.action_type
-            action_type_counts[action_type] = action_type_counts.get(action_type, 0) + 1
+        current_hour = now.replace(minute=0, second=0, microsecond=0)
+        today = current_hour.replace(hour=0)
+
+        action_counts = dict(
+            db.session.query(ActivityLog.action, db.func.count(ActivityLog.id))
+            .group_by(ActivityLog.action)
+            .all()
+        )
+        action_type_counts = dict(
+            db.session.query(ActivityLog.action_type, db.func.count(ActivityLog.id))
+            .filter(ActivityLog.timestamp >= thirty_days_ago)
+            .group_by(ActivityLog.action_type)
+            .all()
+        )
+        last_7_reports = ActivityLog.query.filter(
+            ActivityLog.timestamp >= seven_days_ago,
+            ActivityLog.action_type == "generated"
+        ).count()
         
         approvals = action_type_counts.get("approved", 0)
         flags = action_type_counts.get("flagged", 0) + action_type_counts.get("rejected", 0)
         reports = action_type_counts.get("generated", 0)
         uploads = action_type_counts.get("uploaded", 0)
+        last_30_days = sum(action_type_counts.values())
         
         recent_activities = ActivityLog.query.order_by(ActivityLog.timestamp.desc()).limit(5).all()
         
         return jsonify({
             "success": True,
-            "totalActivities": len(activities_30d),
-            "last30Days": len(activities_30d),
+            "totalActivities": last_30_days,
+            "allTimeActivities": sum(action_counts.values()),
+            "last30Days": last_30_days,
             "approvals": approvals,
             "flagsRejections": flags,
             "reportsGenerated": reports,
             "uploads": uploads,
-            "last7Reports": len([a for a in activities_7d if a.action_type == "generated"]),
+            "last7Reports": last_7_reports,
             "actionCounts": action_counts,
             "actionTypeCounts": action_type_counts,
+            "hourlyActivity": activity_histogram(current_hour - timedelta(hours=hours - 1), "hour", hours),
+            "dailyActivity": activity_histogram(today - timedelta(days=days - 1), "day", days),
             "recentActivities": [a.to_dict() for a in recent_activities]
         })
     except Exception as e:
@@ -1903,6 +3055,7 @@ def get_audit_trail():
 
 
 @app.route("/dashboard/auditor-overview", methods=["GET"])
+@cached_response(generations=(DASHBOARD_GENERATION, ACTIVITY_GENERATION))
 def get_auditor_overview():
     try:
         expenses = Expense.query.all()
@@ -1928,12 +3081,16 @@ def get_auditor_overview():
         from collections import defaultdict
         monthly_data = defaultdict(lambda: {"verified": 0, "flagged": 0})
         
-        for expense in expenses:
-            month_year = expense.uploaded_at.strftime("%b") if expense.uploaded_at else "Nov"
-            if expense.id in anomalous_ids:
-                monthly_data[month_year]["flagged"] += 1
-            else:
-                monthly_data[month_year]["verified"] += 1
+        rollup = db.session.query(
+            MonthlyRollup.month,
+            db.func.sum(MonthlyRollup.expense_count),
+            db.func.sum(MonthlyRollup.flagged_count)
+        ).filter(MonthlyRollup.expense_count > 0).group_by(MonthlyRollup.month)
+        
+        for month_year, month_expenses, month_flagged in rollup:
+            month_name = datetime.strptime(month_year, "%Y-%m").strftime("%b")
+            monthly_data[month_name]["flagged"] += month_flagged
+            monthly_data[month_name]["verified"] += month_expenses - month_flagged
         
         review_stats = []
         months_order = ["Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
@@ -1984,6 +3141,7 @@ def get_auditor_overview():
 
 
 @app.route("/auditor/expenses", methods=["GET"])
+@cached_response
 def get_auditor_expenses():
     try:
         expenses = Expense.query.all()
@@ -2031,18 +3189,18 @@ def get_auditor_expenses():
         from collections import defaultdict
         category_trends = defaultdict(lambda: {})
         
+        monthly_amounts = defaultdict(float)
+        rollup = db.session.query(MonthlyRollup.month, MonthlyRollup.category, MonthlyRollup.total_amount) \
+            .filter(MonthlyRollup.expense_count > 0)
+        for month_year, category, amount in rollup:
+            month_name = datetime.strptime(month_year, "%Y-%m").strftime("%b")
+            monthly_amounts[(month_name, category)] += amount
+        
         months_order = ["Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
         for month in months_order:
             month_data = {"month": month}
             for category in category_spending.keys():
-                month_data[category] = 0
-            
-            for expense in expenses:
-                exp_month = expense.uploaded_at.strftime("%b") if expense.uploaded_at else "Nov"
-                if exp_month == month:
-                    category = expense.category or "Other"
-                    if category in month_data:
-                        month_data[category] = month_data.get(category, 0) + expense.amount
+                month_data[category] = monthly_amounts.get((month, category), 0)
             
             category_trends[month] = month_data
         
@@ -2060,10 +3218,10 @@ def get_auditor_expenses():
 
 
 @app.route("/auditor/anomalies", methods=["GET"])
+@cached_response
 def get_auditor_anomalies():
     try:
-        anomalies = AnomalyDetection.query.all()
-        expenses = Expense.query.all()
+        anomalies = AnomalyDetection.query.order_by(AnomalyDetection.id).all()
         
         total_flagged = len(anomalies)
         pending_reviews = len([a for a in anomalies if a.status == "Pending"])
@@ -2075,7 +3233,7 @@ def get_auditor_anomalies():
         anomalies_by_month = defaultdict(int)
         
         for anomaly in anomalies:
-            expense = Expense.query.get(anomaly.expense_id)
+            expense = anomaly.expense
             if expense and expense.uploaded_at:
                 month = expense.uploaded_at.strftime("%b")
                 anomalies_by_month[month] += 1
@@ -2116,7 +3274,7 @@ def get_auditor_anomalies():
         
         flagged_transactions = []
         for anomaly in anomalies[:20]:
-            expense = Expense.query.get(anomaly.expense_id)
+            expense = anomaly.expense
             if expense:
                 severity_map = {"Critical": "high", "High": "high", "Medium": "medium", "Low": "low"}
                 flagged_transactions.append({
@@ -2132,7 +3290,7 @@ def get_auditor_anomalies():
         
         explainability_data = []
         for anomaly in anomalies[:3]:
-            expense = Expense.query.get(anomaly.expense_id)
+            expense = anomaly.expense
             if expense:
                 severity_map = {"Critical": "high", "High": "high", "Medium": "medium", "Low": "low"}
                 explainability_data.append({
@@ -2167,11 +3325,11 @@ def get_auditor_anomalies():
 # ------------------------
 if __name__ == "__main__":
     with app.app_context():
-        db.create_all()
-        try:
-            migrate_database()
-        except:
-            pass
+        migrate_database()
+
+    if OCR_MODE == "queue":
+        from ocr_worker import start_workers
+        start_workers(OCR_WORKERS)
 
     port = int(os.environ.get("PORT", 5000))
     app.run(host="0.0.0.0", port=port)
\ No newline at end of file
@@ -0,0 +1,76 @@
+"""
+Gunicorn configuration for the DocMind AI backend.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+With GUNICORN_PRELOAD=1 the app and its models (PaddleOCR, the classifier
+and NER) are loaded once in the master process and frozen before workers
+are forked, so all workers share the weights copy-on-write instead of each
+holding its own copy. Use measure_worker_memory.py in the project root to
+compare per-worker RSS/PSS between the two modes.
+"""
+
+import multiprocessing
+import os
+import subprocess
+import sys
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5000)}"
+workers = int(os.getenv("WEB_CONCURRENCY", 1))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 120))
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "0").lower() in ("1", "true", "yes")
+
+if preload_app:
+    # Load every model during the master's import of app.py, not lazily in each worker
+    os.environ.setdefault("MODEL_WARMUP", "all")
+    # Idle unloading would make each worker reload its own private copy
+    os.environ.setdefault("MODEL_IDLE_TTL", "0")
+    # Split the cores between workers instead of every worker using all of them
+    os.environ.setdefault("TORCH_NUM_THREADS", str(max(1, multiprocessing.cpu_count() // workers)))
+
+_frozen = False
+
+
+def pre_fork(server, worker):
+    global _frozen
+    if preload_app and not _frozen:
+        from utils.model_registry import model_registry
+        model_registry.freeze()
+        _frozen = True
+        server.log.info("Models loaded and frozen in master: %s",
+                        ", ".join(name for name, s in model_registry.status().items() if s["loaded"]))
+
+
+def post_fork(server, worker):
+    if preload_app:
+        # Connections opened by the master must not be shared between workers
+        from app import app, db
+        with app.app_context():
+            db.engine.dispose(close=False)
+
+
+MIGRATE_COMMAND = "from app import app, migrate_database\nwith app.app_context(): migrate_database()"
+
+
+def on_starting(server):
+    # Apply schema migrations once, before any worker starts, instead of racing in every worker
+    if preload_app:
+        # The master has already imported the app; post_fork drops its connections
+        from app import app, db, migrate_database
+        with app.app_context():
+            migrate_database()
+            db.engine.dispose()
+        return
+
+    # Without preload the master must not import the app (workers would
+    # inherit it and its models), so migrate in a short-lived process
+    env = dict(os.environ, MODEL_WARMUP="")
+    subprocess.run([sys.executable, "-c", MIGRATE_COMMAND], check=True, env=env,
+                   cwd=os.path.dirname(os.path.abspath(__file__)))
+
+
+def worker_exit(server, worker):
+    # Write out buffered audit log entries before the worker goes away
+    from app import activity_writer
+    activity_writer.close()
@@ -0,0 +1,67 @@
+"""
+OCR Job Worker
+Processes receipts queued by /ocr when OCR_MODE=queue.
+
+Run from the backend folder alongside the web server:
+    python ocr_worker.py --workers 4
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+from typing import List
+
+
+def work(poll_interval: float = 1.0):
+    """Claim and process queued OCR jobs until the process is stopped."""
+    # Imported here so each worker process loads its own models and DB engine
+    from app import app, db, get_ocr_job_queue, process_receipt
+
+    queue = get_ocr_job_queue()
+    print(f"[OCR worker {os.getpid()}] waiting for jobs")
+
+    while True:
+        job = queue.claim()
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+
+        payload = job["payload"]
+        filepath = payload["filepath"]
+
+        with app.app_context():
+            try:
+                result = process_receipt(filepath, payload["filename"], payload["user"], payload["ip_address"])
+                queue.complete(job["id"], result)
+            except Exception as error:
+                db.session.rollback()
+                queue.fail(job["id"], str(error))
+            finally:
+                if os.path.exists(filepath):
+                    os.remove(filepath)
+
+
+def start_workers(count: int, poll_interval: float = 1.0) -> List[multiprocessing.Process]:
+    """Start `count` daemon worker processes and return them."""
+    workers = []
+    for _ in range(max(1, count)):
+        process = multiprocessing.Process(target=work, args=(poll_interval,), daemon=True)
+        process.start()
+        workers.append(process)
+    return workers
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run OCR job workers")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("OCR_WORKERS", 2)))
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    args = parser.parse_args()
+
+    processes = start_workers(args.workers, args.poll_interval)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
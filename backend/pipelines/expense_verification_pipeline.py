@@ -3,70 +3,81 @@ Expense Verification Pipeline
 Orchestrates the multi-agent system for expense analysis.
 """
 
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List
 from ai_agents.document_understanding_agent import DocumentUnderstandingAgent
 from ai_agents.expense_categorization_agent import ExpenseCategorizationAgent
 from ai_agents.fraud_consistency_agent import FraudConsistencyAgent
 from ai_agents.audit_summary_agent import AuditSummaryAgent
 from services.anomaly_detection import anomaly_detector
+from pipelines.stage_executor import Stage, StageExecutor
 
 
 class ExpenseVerificationPipeline:
     """Main pipeline for expense verification using multi-agent AI system."""
 
-    def __init__(self):
+    def __init__(self, max_workers: int = 4):
         self.doc_agent = DocumentUnderstandingAgent()
         self.cat_agent = ExpenseCategorizationAgent()
         self.fraud_agent = FraudConsistencyAgent()
         self.summary_agent = AuditSummaryAgent()
 
-    def process_expense(self, ocr_text: str, historical_expenses: List[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """
-        Process an expense through the complete AI pipeline.
-
-        Args:
-            ocr_text: Raw OCR text from PaddleOCR-VL
-            historical_expenses: List of previous expenses for context
-
-        Returns:
-            Complete analysis results
-        """
-        if historical_expenses is None:
-            historical_expenses = []
+        # Fraud analysis and anomaly detection only need the extraction and
+        # categorization results, so they run concurrently
+        self.executor = StageExecutor([
+            Stage("document", self._understand_document),
+            Stage("categorization", self._categorize, depends_on=["document"]),
+            Stage("fraud", self._analyze_fraud, depends_on=["document", "categorization"]),
+            Stage("anomaly", self._detect_anomaly, depends_on=["document", "categorization"]),
+            Stage("summary", self._summarize, depends_on=["document", "categorization", "fraud", "anomaly"])
+        ], max_workers=max_workers)
 
-        # Step 1: Document Understanding
-        doc_result = self.doc_agent.process({"ocr_text": ocr_text})
-        extracted_data = doc_result["extracted_data"]
+    def _understand_document(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        return self.doc_agent.process({"ocr_text": context["ocr_text"]})
 
-        # Step 2: Expense Categorization
-        cat_input = {
+    def _categorization_input(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        extracted_data = context["document"]["extracted_data"]
+        return {
             "vendor": extracted_data.get("vendor"),
             "amount": extracted_data.get("amount"),
             "items": extracted_data.get("items", []),
-            "description": ocr_text[:1000]  # First 1000 chars as description
+            "description": context["ocr_text"][:1000]  # First 1000 chars as description
         }
-        cat_result = self.cat_agent.process(cat_input)
 
-        # Step 3: Fraud & Consistency Analysis
-        fraud_input = {
+    def _categorize(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        return self.cat_agent.process(self._categorization_input(context))
+
+    def _fraud_input(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        extracted_data = context["document"]["extracted_data"]
+        return {
             "vendor": extracted_data.get("vendor"),
             "amount": extracted_data.get("amount"),
-            "category": cat_result["category"],
+            "category": context["categorization"]["category"],
             "date": extracted_data.get("date"),
-            "history": historical_expenses
+            "history": context["historical_expenses"]
         }
-        fraud_result = self.fraud_agent.process(fraud_input)
 
-        # Step 4: Anomaly Detection
-        current_expense = {
+    def _analyze_fraud(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        return self.fraud_agent.process(self._fraud_input(context))
+
+    def _anomaly_input(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        extracted_data = context["document"]["extracted_data"]
+        return {
             "vendor": extracted_data.get("vendor"),
             "amount": extracted_data.get("amount"),
-            "category": cat_result["category"]
+            "category": context["categorization"]["category"]
         }
-        anomaly_score = anomaly_detector.detect_anomaly(current_expense, historical_expenses)
 
-        # Step 5: Audit Summary
-        summary_input = {
+    def _detect_anomaly(self, context: Dict[str, Any]) -> float:
+        return anomaly_detector.detect_anomaly(self._anomaly_input(context), context["historical_expenses"])
+
+    def _summary_input(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        extracted_data = context["document"]["extracted_data"]
+        cat_result = context["categorization"]
+        fraud_result = context["fraud"]
+        return {
             "vendor": extracted_data.get("vendor"),
             "amount": extracted_data.get("amount"),
             "category": cat_result["category"],
@@ -76,26 +87,193 @@ class ExpenseVerificationPipeline:
             "cat_reasoning": cat_result["reasoning"],
             "fraud_risk": fraud_result["risk_level"],
             "fraud_confidence": fraud_result["confidence"],
-            "anomaly_score": anomaly_score
+            "anomaly_score": context["anomaly"]
         }
-        summary_result = self.summary_agent.process(summary_input)
+
+    def _summarize(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        return self.summary_agent.process(self._summary_input(context))
+
+    def process_expense(self, ocr_text: str, historical_expenses: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Process an expense through the complete AI pipeline.
+
+        Args:
+            ocr_text: Raw OCR text from PaddleOCR-VL
+            historical_expenses: List of previous expenses for context
+
+        Returns:
+            Complete analysis results, including wall-clock timings of each
+            stage under "stage_timings"
+        """
+        if historical_expenses is None:
+            historical_expenses = []
+
+        started = time.perf_counter()
+        outputs, stage_timings = self.executor.run({
+            "ocr_text": ocr_text,
+            "historical_expenses": historical_expenses
+        })
 
         # Compile final results
-        final_result = {
-            "expense_data": extracted_data,
+        final_result = self._compile_result(outputs, stage_timings)
+        final_result["total_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return final_result
+
+    async def aprocess_expense(self, ocr_text: str,
+                               historical_expenses: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Async variant of process_expense for use inside an event loop.
+
+        Agent calls go through the shared async ERNIE client, so any number
+        of expenses can be processed concurrently (e.g. with asyncio.gather)
+        while the client keeps requests within its rate and in-flight
+        limits. Anomaly detection runs on a worker thread alongside the
+        fraud analysis.
+
+        Args:
+            ocr_text: Raw OCR text from PaddleOCR-VL
+            historical_expenses: List of previous expenses for context
+
+        Returns:
+            Same as process_expense
+        """
+        if historical_expenses is None:
+            historical_expenses = []
+
+        started = time.perf_counter()
+        context = {"ocr_text": ocr_text, "historical_expenses": historical_expenses}
+        stage_timings = {}
+
+        async def run(name: str, stage):
+            start_ms = round((time.perf_counter() - started) * 1000, 2)
+            try:
+                context[name] = await stage
+            finally:
+                end_ms = round((time.perf_counter() - started) * 1000, 2)
+                stage_timings[name] = {"start_ms": start_ms, "end_ms": end_ms,
+                                       "duration_ms": round(end_ms - start_ms, 2)}
+
+        await run("document", self.doc_agent.aprocess({"ocr_text": ocr_text}))
+        await run("categorization", self.cat_agent.aprocess(self._categorization_input(context)))
+        await asyncio.gather(
+            run("fraud", self.fraud_agent.aprocess(self._fraud_input(context))),
+            run("anomaly", asyncio.to_thread(self._detect_anomaly, context))
+        )
+        await run("summary", self.summary_agent.aprocess(self._summary_input(context)))
+
+        final_result = self._compile_result(context, {name: stage_timings[name] for name in self.executor.order})
+        final_result["total_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return final_result
+
+    def _compile_result(self, outputs: Dict[str, Any], stage_timings: Dict[str, Dict[str, float]]) -> Dict[str, Any]:
+        doc_result = outputs["document"]
+        cat_result = outputs["categorization"]
+        fraud_result = outputs["fraud"]
+        summary_result = outputs["summary"]
+
+        return {
+            "expense_data": doc_result["extracted_data"],
             "categorization": cat_result,
             "fraud_analysis": fraud_result,
-            "anomaly_score": anomaly_score,
+            "anomaly_score": outputs["anomaly"],
             "audit_summary": summary_result,
             "processing_steps": [
                 doc_result,
                 cat_result,
                 fraud_result,
                 summary_result
-            ]
+            ],
+            "stage_timings": stage_timings
         }
 
-        return final_result
+    def process_batch(self, ocr_texts: List[str], historical_expenses: List[Dict[str, Any]] = None,
+                      max_concurrency: int = 4) -> List[Dict[str, Any]]:
+        """
+        Process several expenses at once.
+
+        Agent stages run per receipt on at most `max_concurrency` threads.
+        Anomaly detection runs once for the whole batch: the model is
+        trained on the history (if needed) a single time and every receipt
+        is scored in one vectorized call.
+
+        Args:
+            ocr_texts: Raw OCR text of each receipt
+            historical_expenses: List of previous expenses for context
+            max_concurrency: Receipts whose agent calls may be in flight at once
+
+        Returns:
+            One entry per OCR text, in input order: the same result as
+            process_expense (stage timings relative to the start of the
+            batch), or {"error": ..., "failed_stage": ...} if a stage failed
+            for that receipt
+        """
+        if historical_expenses is None:
+            historical_expenses = []
+
+        started = time.perf_counter()
+        contexts = [{"ocr_text": text, "historical_expenses": historical_expenses} for text in ocr_texts]
+        timings = [{} for _ in ocr_texts]
+        errors = [None] * len(ocr_texts)
+
+        def elapsed_ms() -> float:
+            return round((time.perf_counter() - started) * 1000, 2)
+
+        def record(i: int, name: str, start_ms: float):
+            end_ms = elapsed_ms()
+            timings[i][name] = {"start_ms": start_ms, "end_ms": end_ms, "duration_ms": round(end_ms - start_ms, 2)}
+
+        def run_stages(i: int, stages: List):
+            for name, func in stages:
+                start_ms = elapsed_ms()
+                try:
+                    contexts[i][name] = func(contexts[i])
+                except Exception as e:
+                    errors[i] = {"error": f"{name} stage failed: {str(e)}", "failed_stage": name}
+                    return
+                finally:
+                    record(i, name, start_ms)
+
+        agent_stages = [
+            ("document", self._understand_document),
+            ("categorization", self._categorize),
+            ("fraud", self._analyze_fraud)
+        ]
+
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency), thread_name_prefix="pipeline-batch") as pool:
+            list(pool.map(lambda i: run_stages(i, agent_stages), range(len(ocr_texts))))
+
+            # One model call for every receipt that made it this far
+            scoring = []
+            for i, context in enumerate(contexts):
+                if errors[i] is not None:
+                    continue
+                try:
+                    anomaly_detector.feature_row(self._anomaly_input(context))
+                    scoring.append(i)
+                except Exception as e:
+                    errors[i] = {"error": f"anomaly stage failed: {str(e)}", "failed_stage": "anomaly"}
+
+            start_ms = elapsed_ms()
+            try:
+                scores = anomaly_detector.detect_anomalies(
+                    [self._anomaly_input(contexts[i]) for i in scoring], historical_expenses
+                )
+            except Exception as e:
+                scores = None
+                for i in scoring:
+                    errors[i] = {"error": f"anomaly stage failed: {str(e)}", "failed_stage": "anomaly"}
+            if scores is not None:
+                for i, score in zip(scoring, scores):
+                    contexts[i]["anomaly"] = float(score)
+                    record(i, "anomaly", start_ms)
+
+            list(pool.map(lambda i: run_stages(i, [("summary", self._summarize)]),
+                          [i for i in scoring if errors[i] is None]))
+
+        return [
+            errors[i] if errors[i] is not None else self._compile_result(contexts[i], timings[i])
+            for i in range(len(ocr_texts))
+        ]
 
     def get_pipeline_status(self) -> Dict[str, Any]:
         """Get status of all pipeline components."""
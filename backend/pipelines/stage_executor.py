@@ -0,0 +1,122 @@
+"""
+Stage Executor
+Runs pipeline stages as a dependency graph, starting each stage on a thread
+pool as soon as the stages it depends on have finished.
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Tuple
+
+
+class Stage:
+    """One pipeline step: a function of the pipeline inputs and its dependencies' outputs."""
+
+    def __init__(self, name: str, func: Callable[[Dict[str, Any]], Any], depends_on: List[str] = None):
+        """
+        Args:
+            name: Unique stage name; its output is stored under this key
+            func: Called with a dict of the pipeline inputs plus the output
+                of every stage in `depends_on`, keyed by stage name
+            depends_on: Names of the stages that must finish first
+        """
+        self.name = name
+        self.func = func
+        self.depends_on = list(depends_on or [])
+
+
+class StageExecutor:
+    """Executes a fixed DAG of stages, running independent stages concurrently."""
+
+    def __init__(self, stages: List[Stage], max_workers: int = 4):
+        """
+        Args:
+            stages: The stages of the pipeline, in any order
+            max_workers: Threads available for stages that can run at once
+
+        Raises:
+            ValueError: On duplicate names, unknown dependencies or cycles
+        """
+        self.stages = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage: {stage.name}")
+            self.stages[stage.name] = stage
+
+        for stage in stages:
+            for dependency in stage.depends_on:
+                if dependency not in self.stages:
+                    raise ValueError(f"Stage {stage.name} depends on unknown stage {dependency}")
+
+        self.order = self._topological_order()
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pipeline-stage")
+
+    def _topological_order(self) -> List[str]:
+        remaining = {name: set(stage.depends_on) for name, stage in self.stages.items()}
+        order = []
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(f"Stage dependencies form a cycle: {', '.join(sorted(remaining))}")
+            for name in ready:
+                order.append(name)
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        return order
+
+    def run(self, inputs: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Dict[str, float]]]:
+        """
+        Run every stage once.
+
+        Args:
+            inputs: Values available to all stages (must not clash with stage names)
+
+        Returns:
+            (output of each stage by name, wall-clock timings of each stage as
+            start_ms/end_ms relative to the start of the run and duration_ms)
+
+        Raises:
+            The first exception raised by a stage; stages not yet started are skipped
+        """
+        started = time.perf_counter()
+        outputs: Dict[str, Any] = {}
+        timings: Dict[str, Dict[str, float]] = {}
+        running = {}
+        pending = list(self.order)
+
+        def elapsed_ms() -> float:
+            return round((time.perf_counter() - started) * 1000, 2)
+
+        def timed(stage: Stage, args: Dict[str, Any]):
+            start_ms = elapsed_ms()
+            try:
+                return stage.func(args)
+            finally:
+                end_ms = elapsed_ms()
+                timings[stage.name] = {
+                    "start_ms": start_ms,
+                    "end_ms": end_ms,
+                    "duration_ms": round(end_ms - start_ms, 2)
+                }
+
+        try:
+            while pending or running:
+                for name in list(pending):
+                    stage = self.stages[name]
+                    if all(dependency in outputs for dependency in stage.depends_on):
+                        args = dict(inputs)
+                        args.update({dependency: outputs[dependency] for dependency in stage.depends_on})
+                        running[self._pool.submit(timed, stage, args)] = name
+                        pending.remove(name)
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    outputs[name] = future.result()
+        finally:
+            # On failure, let stages already running finish before returning
+            wait(running)
+
+        return outputs, {name: timings[name] for name in self.order if name in timings}
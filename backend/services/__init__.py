@@ -3,5 +3,6 @@ Services package for DocMind AI.
 """
 
 from .anomaly_detection import anomaly_detector
+from .job_queue import JobQueue
 
-__all__ = ['anomaly_detector']
\ No newline at end of file
+__all__ = ['anomaly_detector', 'JobQueue']
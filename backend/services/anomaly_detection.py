@@ -3,6 +3,8 @@ Anomaly Detection Service
 Uses Isolation Forest to detect unusual expense patterns.
 """
 
+import threading
+
 import numpy as np
 from sklearn.ensemble import IsolationForest
 from typing import List, Dict, Any
@@ -18,6 +20,17 @@ class AnomalyDetectionService:
             random_state=42
         )
         self.is_trained = False
+        # The global instance is shared by request threads and by
+        # aprocess_expense's worker threads; fitting must not overlap scoring
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def feature_row(expense: Dict[str, Any]) -> List[float]:
+        """Model features of one expense: amount, category (encoded), vendor (encoded)."""
+        amount = float(expense.get('amount', 0))
+        category = hash(expense.get('category', 'misc')) % 1000  # Simple category encoding
+        vendor_hash = hash(expense.get('vendor', 'unknown')) % 1000
+        return [amount, category, vendor_hash]
 
     def train(self, historical_expenses: List[Dict[str, Any]]):
         """
@@ -29,19 +42,11 @@ class AnomalyDetectionService:
         if not historical_expenses:
             return
 
-        # Extract features: amount, category (encoded), vendor frequency, etc.
-        features = []
-        for expense in historical_expenses:
-            amount = expense.get('amount', 0)
-            category = hash(expense.get('category', 'misc')) % 1000  # Simple category encoding
-            vendor_hash = hash(expense.get('vendor', 'unknown')) % 1000
-
-            features.append([amount, category, vendor_hash])
-
-        if len(features) > 10:  # Need minimum data for training
-            X = np.array(features)
-            self.model.fit(X)
-            self.is_trained = True
+        if len(historical_expenses) > 10:  # Need minimum data for training
+            X = np.array([self.feature_row(expense) for expense in historical_expenses])
+            with self._lock:
+                self.model.fit(X)
+                self.is_trained = True
 
     def detect_anomaly(self, expense: Dict[str, Any], historical_expenses: List[Dict[str, Any]] = None) -> float:
         """
@@ -54,26 +59,45 @@ class AnomalyDetectionService:
         Returns:
             Anomaly score (negative = anomalous, positive = normal)
         """
-        if not self.is_trained:
-            # Retrain if we have historical data
-            if historical_expenses:
-                self.train(historical_expenses)
+        with self._lock:
+            if not self.is_trained:
+                # Retrain if we have historical data
+                if historical_expenses:
+                    self.train(historical_expenses)
 
-        if not self.is_trained:
-            return 0.0  # Neutral score if no training data
+            if not self.is_trained:
+                return 0.0  # Neutral score if no training data
 
-        # Extract features from current expense
-        amount = expense.get('amount', 0)
-        category = hash(expense.get('category', 'misc')) % 1000
-        vendor_hash = hash(expense.get('vendor', 'unknown')) % 1000
-
-        X = np.array([[amount, category, vendor_hash]])
+            X = np.array([self.feature_row(expense)])
 
-        # Get anomaly score (-1 = anomaly, 1 = normal)
-        score = self.model.decision_function(X)[0]
+            # Get anomaly score (-1 = anomaly, 1 = normal)
+            score = self.model.decision_function(X)[0]
 
         return score
 
+    def detect_anomalies(self, expenses: List[Dict[str, Any]],
+                         historical_expenses: List[Dict[str, Any]] = None) -> np.ndarray:
+        """
+        Score several expenses with a single model call.
+
+        Args:
+            expenses: Expenses to analyze
+            historical_expenses: Historical data for context (used to train
+                the model if it isn't trained yet)
+
+        Returns:
+            Anomaly score per expense, in order (all 0.0 without training data)
+        """
+        with self._lock:
+            if not self.is_trained and historical_expenses:
+                self.train(historical_expenses)
+
+            if not self.is_trained or not expenses:
+                return np.zeros(len(expenses))
+
+            X = np.array([self.feature_row(expense) for expense in expenses])
+            return self.model.decision_function(X)
+
 
 # Global instance
 anomaly_detector = AnomalyDetectionService()
\ No newline at end of file
@@ -0,0 +1,109 @@
+"""
+Audit Log Writer
+Buffers activity log rows and writes them to the database in bulk.
+"""
+
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+
+class AuditLogWriter:
+    """Collects audit log entries in memory and flushes them in batches from a background thread."""
+
+    def __init__(self, write_batch: Callable[[List[Dict[str, Any]]], None], batch_size: int = 100,
+                 flush_interval: float = 2.0, max_buffer: int = 10000):
+        """
+        Initialize the writer. The background thread starts with the first entry.
+
+        Args:
+            write_batch: Persists a list of entries (column name -> value) in
+                one transaction; raises on failure
+            batch_size: Number of buffered entries that triggers an early flush
+            flush_interval: Longest time in seconds an entry waits in the buffer
+            max_buffer: Entries kept for retry after failed flushes before the
+                oldest are dropped
+        """
+        self.write_batch = write_batch
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.written = 0
+        self.dropped = 0
+        self._reset()
+
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # Also run in forked children: the parent's buffer and thread are not theirs
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def log(self, entry: Dict[str, Any]):
+        """Queue one entry; it is written within flush_interval seconds."""
+        with self._lock:
+            if self._closed:
+                closed = True
+            else:
+                closed = False
+                self._buffer.append(entry)
+                full = len(self._buffer) >= self.batch_size
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+                    self._thread.start()
+
+        if closed:
+            # Shutting down: nothing will flush later, so write it now
+            self.write_batch([entry])
+            return
+        if full:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """Write everything buffered so far; returns the number of entries written."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return 0
+
+            try:
+                self.write_batch(batch)
+            except Exception as e:
+                with self._lock:
+                    # Keep the entries (oldest first) for the next attempt
+                    self._buffer = batch + self._buffer
+                    overflow = len(self._buffer) - self.max_buffer
+                    if overflow > 0:
+                        del self._buffer[:overflow]
+                        self.dropped += overflow
+                print(f"[AuditLogWriter] Flush of {len(batch)} entries failed: {str(e)}")
+                return 0
+
+            self.written += len(batch)
+            return len(batch)
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def close(self, timeout: float = 10.0):
+        """Stop the background thread and flush whatever is still buffered."""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        self._wakeup.set()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        self.flush()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._buffer)
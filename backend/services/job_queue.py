@@ -0,0 +1,164 @@
+"""
+Job Queue Service
+SQLite-backed local work queue used to run OCR uploads outside the web request.
+"""
+
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Optional
+from uuid import uuid4
+
+
+class JobQueue:
+    """Durable FIFO job queue stored in a local SQLite file."""
+
+    def __init__(self, path: str, visibility_timeout: int = 600, max_attempts: int = 3):
+        """
+        Initialize the queue, creating the database file if needed.
+
+        Args:
+            path: Location of the SQLite queue file
+            visibility_timeout: Seconds after which a running job whose worker
+                stopped responding is handed to another worker
+            max_attempts: How many times a job is claimed before it is failed
+        """
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode; claim() opens its own write transaction
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_schema(self):
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_jobs_status_created ON jobs (status, created_at)")
+        finally:
+            conn.close()
+
+    def enqueue(self, payload: Dict[str, Any]) -> str:
+        """Add a job and return its id."""
+        job_id = str(uuid4())
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT INTO jobs (id, status, payload, created_at) VALUES (?, 'queued', ?, ?)",
+                (job_id, json.dumps(payload), time.time())
+            )
+        finally:
+            conn.close()
+        return job_id
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """
+        Atomically take the oldest runnable job, or return None if there is none.
+
+        Jobs left 'running' past the visibility timeout (e.g. the worker was
+        killed) are claimable again until they run out of attempts.
+        """
+        now = time.time()
+        stale_before = now - self.visibility_timeout
+
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? "
+                "WHERE status = 'running' AND started_at < ? AND attempts >= ?",
+                ("Worker stopped before finishing the job", now, stale_before, self.max_attempts)
+            )
+            row = conn.execute(
+                "SELECT id FROM jobs "
+                "WHERE status = 'queued' OR (status = 'running' AND started_at < ?) "
+                "ORDER BY created_at LIMIT 1",
+                (stale_before,)
+            ).fetchone()
+
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ?, attempts = attempts + 1 WHERE id = ?",
+                (now, row["id"])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        return self.get(row["id"])
+
+    def complete(self, job_id: str, result: Dict[str, Any]):
+        self._finish(job_id, "done", result=json.dumps(result))
+
+    def fail(self, job_id: str, error: str):
+        self._finish(job_id, "failed", error=error)
+
+    def _finish(self, job_id: str, status: str, result: str = None, error: str = None):
+        conn = self._connect()
+        try:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, result, error, time.time(), job_id)
+            )
+        finally:
+            conn.close()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job as a dict, or None if the id is unknown."""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+
+        if row is None:
+            return None
+
+        return {
+            "id": row["id"],
+            "status": row["status"],
+            "payload": json.loads(row["payload"]),
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"]
+        }
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per status."""
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        finally:
+            conn.close()
+        return {row["status"]: row["n"] for row in rows}
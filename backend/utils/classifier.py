@@ -1,8 +1,12 @@
 import os
 import json
-from typing import List, Set
+from typing import List, Set, Tuple
+
+import numpy as np
 from transformers import pipeline
 
+from utils.model_registry import model_registry
+
 BASE_CATEGORIES = [
     "Travel",
     "Food",
@@ -35,30 +39,25 @@ BASE_CATEGORIES = [
 def load_dataset_categories() -> Set[str]:
     dataset_path = os.path.join("backend", "datasets", "Receipts dataset")
     categories = set()
-    # Scan for CSV/JSON files
+    # Single pass over the dataset: JSON files, plus .txt files that hold JSON
     for root, dirs, files in os.walk(dataset_path):
         for file in files:
-            if file.endswith(('.csv', '.json')):
-                filepath = os.path.join(root, file)
+            filepath = os.path.join(root, file)
+            if file.endswith('.json'):
                 try:
-                    if file.endswith('.json'):
-                        with open(filepath, 'r') as f:
-                            data = json.load(f)
-                            # Assume data is list of dicts or dict with category field
-                            if isinstance(data, list):
-                                for item in data:
-                                    if 'category' in item:
-                                        categories.add(item['category'])
-                            elif isinstance(data, dict) and 'category' in data:
-                                categories.add(data['category'])
-                    # For CSV, could use pandas, but to avoid dependency, skip or implement
+                    with open(filepath, 'r') as f:
+                        data = json.load(f)
+                        # Assume data is list of dicts or dict with category field
+                        if isinstance(data, list):
+                            for item in data:
+                                if 'category' in item:
+                                    categories.add(item['category'])
+                        elif isinstance(data, dict) and 'category' in data:
+                            categories.add(data['category'])
                 except:
                     pass
-    # Also scan .txt files that are JSON
-    for root, dirs, files in os.walk(dataset_path):
-        for file in files:
-            if file.endswith('.txt'):
-                filepath = os.path.join(root, file)
+            # For CSV, could use pandas, but to avoid dependency, skip or implement
+            elif file.endswith('.txt'):
                 try:
                     with open(filepath, 'r') as f:
                         data = json.load(f)
@@ -73,26 +72,109 @@ def load_categories() -> List[str]:
     all_cats = set(BASE_CATEGORIES) | dataset_cats
     return sorted(list(all_cats))
 
-FINAL_CATEGORY_LIST = load_categories()
+_category_list = None
+
+def get_category_list() -> List[str]:
+    """Category labels, scanned from the dataset on first use rather than at import."""
+    global _category_list
+    if _category_list is None:
+        _category_list = load_categories()
+    return _category_list
+
+def __getattr__(name):
+    # Keeps `from utils.classifier import FINAL_CATEGORY_LIST` working without an import-time scan
+    if name == "FINAL_CATEGORY_LIST":
+        return get_category_list()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# "zero-shot" runs one NLI pass per label; "embedding" scores every label with
+# a single similarity against label embeddings computed once when it loads
+CLASSIFIER_ENGINE = os.getenv("CLASSIFIER_ENGINE", "zero-shot").lower()
+EMBEDDING_MODEL = os.getenv("CLASSIFIER_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+LABEL_TEMPLATE = "This is a receipt for {}."
+
+
+class EmbeddingClassifier:
+    """Nearest-label classifier over mean-pooled transformer embeddings."""
+
+    def __init__(self, labels: List[str], model_name: str = EMBEDDING_MODEL, temperature: float = 0.05):
+        self.labels = list(labels)
+        self.temperature = temperature
+        self.extractor = pipeline("feature-extraction", model=model_name)
+        # Encoded once; every receipt is scored against this matrix
+        self.label_matrix = self.encode([LABEL_TEMPLATE.format(label) for label in self.labels])
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        outputs = self.extractor(texts, truncation=True)
+        vectors = np.stack([np.asarray(out[0]).mean(axis=0) for out in outputs])
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.clip(norms, 1e-12, None)
 
-try:
-    zero_shot_classifier = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
-except Exception:
-    zero_shot_classifier = None
+    def classify(self, texts: List[str]) -> List[Tuple[str, float]]:
+        """Return (label, confidence) for each text."""
+        similarities = self.encode(texts) @ self.label_matrix.T
+        logits = similarities / self.temperature
+        logits -= logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        probs /= probs.sum(axis=1, keepdims=True)
+        best = probs.argmax(axis=1)
+        return [(self.labels[j], float(probs[i, j])) for i, j in enumerate(best)]
+
+
+if CLASSIFIER_ENGINE == "embedding":
+    model_registry.register("embedding_classifier", lambda: EmbeddingClassifier(get_category_list()))
+else:
+    model_registry.register(
+        "zero_shot_classifier",
+        lambda: pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
+    )
 
 def clean_text(text: str) -> str:
     return text.strip().lower()
 
-def classify_text(text: str) -> str:
-    cleaned = clean_text(text)
-    if not cleaned:
-        return "Miscellaneous"
-    if zero_shot_classifier:
+def classify_texts_with_scores(texts: List[str], batch_size: int = 8) -> List[Tuple[str, float]]:
+    """Classify several receipts at once, returning (label, confidence) pairs."""
+    cleaned = [clean_text(t) for t in texts]
+    results = [("Miscellaneous", 0.0) if not c else None for c in cleaned]
+    pending = [i for i, c in enumerate(cleaned) if c]
+
+    if CLASSIFIER_ENGINE == "embedding":
+        embedding_classifier, zero_shot_classifier = model_registry.get("embedding_classifier"), None
+    else:
+        embedding_classifier, zero_shot_classifier = None, model_registry.get("zero_shot_classifier")
+
+    if pending and embedding_classifier:
+        try:
+            scored = embedding_classifier.classify([cleaned[i][:512] for i in pending])
+            for i, result in zip(pending, scored):
+                results[i] = result
+        except:
+            pass
+    elif pending and zero_shot_classifier:
         try:
-            result = zero_shot_classifier(cleaned[:512], FINAL_CATEGORY_LIST)
-            return result['labels'][0]
+            outputs = zero_shot_classifier([cleaned[i][:512] for i in pending], get_category_list(),
+                                           batch_size=batch_size)
+            if isinstance(outputs, dict):
+                outputs = [outputs]
+            for i, output in zip(pending, outputs):
+                results[i] = (output['labels'][0], float(output['scores'][0]))
         except:
             pass
+
+    return [result if result is not None else (_keyword_category(cleaned[i]), 0.0)
+            for i, result in enumerate(results)]
+
+def classify_texts(texts: List[str], batch_size: int = 8) -> List[str]:
+    """Classify several receipts, batching them through the model."""
+    return [label for label, _ in classify_texts_with_scores(texts, batch_size)]
+
+def classify_text_with_score(text: str) -> Tuple[str, float]:
+    return classify_texts_with_scores([text])[0]
+
+def classify_text(text: str) -> str:
+    return classify_text_with_score(text)[0]
+
+def _keyword_category(cleaned: str) -> str:
     # Fallback to keyword matching
     keywords = {
         "Food": ["restaurant", "cafe", "food", "meal", "dinner", "lunch", "eat"],
@@ -0,0 +1,208 @@
+"""
+Versioned schema migrations.
+
+The schema version is stored in a one-column `schema_version` table. On
+startup run_migrations() reads it once; when it is already at the latest
+version nothing else touches the database. Each pending migration runs in
+its own transaction together with the version bump.
+
+To change the schema, append a (version, description, function) entry to
+MIGRATIONS. Functions receive a Connection and the app's MetaData and must
+be safe to re-run on a database that already has the change (e.g. a fresh
+database created by metadata.create_all). Data backfills recompute their
+table from scratch, so they are safe to re-run too.
+"""
+
+from typing import Callable, List, Tuple
+
+from sqlalchemy import MetaData, case, func, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateIndex
+
+
+def _create_tables(conn: Connection, metadata: MetaData):
+    metadata.create_all(conn)
+
+
+def _add_user_settings_branding(conn: Connection, metadata: MetaData):
+    columns = {c["name"] for c in inspect(conn).get_columns("user_settings")}
+    for name, ddl in (("logo_path", "VARCHAR(255)"), ("contact_info", "TEXT"), ("help_content", "TEXT")):
+        if name not in columns:
+            conn.execute(text(f"ALTER TABLE user_settings ADD COLUMN {name} {ddl}"))
+
+
+def _create_indexes(*names: str) -> Callable[[Connection, MetaData], None]:
+    """Migration creating the named indexes as declared on the models."""
+    def migrate(conn: Connection, metadata: MetaData):
+        declared = {index.name: index for table in metadata.tables.values() for index in table.indexes}
+        for name in names:
+            conn.execute(CreateIndex(declared[name], if_not_exists=True))
+    return migrate
+
+
+def _backfill_category_stats(conn: Connection, metadata: MetaData):
+    """Recompute category_stats (count, mean, m2, min, max of positive amounts) from expense."""
+    expense = metadata.tables["expense"]
+    stats = metadata.tables["category_stats"]
+    counted = (expense.c.category.isnot(None), expense.c.amount > 0)
+
+    # Two passes (mean first, then squared deviations from it) keep m2 as
+    # accurate as the incremental Welford updates
+    means = select(expense.c.category, func.avg(expense.c.amount).label("mean")) \
+        .where(*counted).group_by(expense.c.category).subquery()
+    deviation = expense.c.amount - means.c.mean
+    rows = conn.execute(
+        select(
+            expense.c.category,
+            func.count(),
+            means.c.mean,
+            func.sum(deviation * deviation),
+            func.min(expense.c.amount),
+            func.max(expense.c.amount)
+        ).join(means, means.c.category == expense.c.category)
+        .where(*counted).group_by(expense.c.category, means.c.mean)
+    ).all()
+
+    conn.execute(stats.delete())
+    if rows:
+        conn.execute(stats.insert(), [
+            {"category": category, "count": count, "mean": mean, "m2": m2 or 0.0,
+             "min_amount": min_amount, "max_amount": max_amount}
+            for category, count, mean, m2, min_amount, max_amount in rows
+        ])
+
+
+def _backfill_vendors(conn: Connection, metadata: MetaData):
+    """Recompute the vendor dimension (occurrences, first/last seen) from expense."""
+    expense = metadata.tables["expense"]
+    vendor = metadata.tables["vendor"]
+
+    rows = conn.execute(
+        select(
+            expense.c.vendor,
+            func.count(),
+            func.min(expense.c.uploaded_at),
+            func.max(expense.c.uploaded_at)
+        ).where(expense.c.vendor.isnot(None)).group_by(expense.c.vendor)
+    )
+
+    vendors = {}
+    for name, count, first_seen, last_seen in rows:
+        # Same normalization as normalize_vendor() in app.py
+        normalized = name.strip().lower()
+        if not normalized:
+            continue
+        row = vendors.setdefault(normalized, {
+            "normalized_name": normalized, "display_name": name.strip(),
+            "occurrence_count": 0, "first_seen": first_seen, "last_seen": last_seen
+        })
+        row["occurrence_count"] += count
+        row["first_seen"] = min(filter(None, (row["first_seen"], first_seen)), default=None)
+        row["last_seen"] = max(filter(None, (row["last_seen"], last_seen)), default=None)
+
+    conn.execute(vendor.delete())
+    if vendors:
+        conn.execute(vendor.insert(), list(vendors.values()))
+
+
+def _backfill_monthly_rollup(conn: Connection, metadata: MetaData):
+    """Recompute monthly_rollup from expense and anomaly_detection, like compute_monthly_rollup() in app.py."""
+    expense = metadata.tables["expense"]
+    anomaly = metadata.tables["anomaly_detection"]
+    rollup = metadata.tables["monthly_rollup"]
+
+    if conn.dialect.name == "sqlite":
+        month = func.strftime("%Y-%m", expense.c.uploaded_at)
+    else:
+        month = func.to_char(expense.c.uploaded_at, "YYYY-MM")
+    month = func.coalesce(month, "2024-11")
+    category = func.coalesce(expense.c.category, "Other")
+    amount = func.coalesce(expense.c.amount, 0.0)
+    flagged = select(anomaly.c.id).where(anomaly.c.expense_id == expense.c.id).exists()
+
+    rows = conn.execute(
+        select(
+            month,
+            category,
+            func.coalesce(func.sum(amount), 0.0),
+            func.count(expense.c.id),
+            func.sum(case((flagged, 1), else_=0)),
+            func.sum(case((flagged, amount), else_=0.0))
+        ).group_by(month, category)
+    ).all()
+
+    conn.execute(rollup.delete())
+    if rows:
+        conn.execute(rollup.insert(), [
+            {"month": m, "category": c, "total_amount": total, "expense_count": count,
+             "flagged_count": flagged_count or 0, "flagged_amount": flagged_amount or 0.0}
+            for m, c, total, count, flagged_count, flagged_amount in rows
+        ])
+
+
+def _seed_data_generations(conn: Connection, metadata: MetaData):
+    """Create the response cache's generation counters (see cached_response in app.py)."""
+    generations = metadata.tables["data_generation"]
+    existing = set(conn.execute(select(generations.c.name)).scalars())
+    for name in ("dashboard", "activity"):
+        if name not in existing:
+            conn.execute(generations.insert().values(name=name, value=0))
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection, MetaData], None]]] = [
+    (1, "Create missing tables", _create_tables),
+    (2, "Add logo, contact and help columns to user_settings", _add_user_settings_branding),
+    (3, "Index duplicate and vendor lookups", _create_indexes(
+        "ix_expense_duplicate_lookup",
+        "ix_expense_vendor_lower",
+    )),
+    (4, "Index listing pagination and anomaly joins", _create_indexes(
+        "ix_expense_uploaded_at_id",
+        "ix_anomaly_detection_expense_id",
+        "ix_anomaly_detection_detected_at_id",
+    )),
+    (5, "Index hot filter and sort columns", _create_indexes(
+        "ix_expense_category_uploaded_at",
+        "ix_anomaly_detection_status",
+        "ix_activity_log_timestamp",
+        "ix_user_settings_role",
+    )),
+    (6, "Backfill per-category amount statistics", _backfill_category_stats),
+    (7, "Backfill the vendor dimension", _backfill_vendors),
+    (8, "Backfill the monthly rollup", _backfill_monthly_rollup),
+    (9, "Seed the response cache generation counters", _seed_data_generations),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn: Connection) -> int:
+    conn.execute(text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"))
+    return conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
+
+
+def run_migrations(engine: Engine, metadata: MetaData) -> List[Tuple[int, str]]:
+    """
+    Apply every migration newer than the stored schema version.
+
+    Args:
+        engine: Engine of the database to migrate
+        metadata: MetaData holding the app's models
+
+    Returns:
+        (version, description) of each migration applied, in order
+    """
+    with engine.begin() as conn:
+        version = current_version(conn)
+    if version >= LATEST_VERSION:
+        return []
+
+    applied = []
+    for number, description, migrate in MIGRATIONS:
+        if number <= version:
+            continue
+        with engine.begin() as conn:
+            migrate(conn, metadata)
+            conn.execute(text("INSERT INTO schema_version (version) VALUES (:version)"), {"version": number})
+        applied.append((number, description))
+    return applied
@@ -0,0 +1,217 @@
+import gc
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+
+def _current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes (Linux), or None if unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _reset_torch_threads():
+    """Re-apply torch's intra-op thread count; its pool is not inherited sanely across fork."""
+    torch = sys.modules.get("torch")
+    threads = os.getenv("TORCH_NUM_THREADS")
+    if torch is not None and threads:
+        torch.set_num_threads(int(threads))
+
+
+class _Entry:
+    def __init__(self, name: str, loader: Callable[[], Any], ttl: Optional[float],
+                 after_fork: Optional[Callable[[Any], None]] = None):
+        self.name = name
+        self.loader = loader
+        self.ttl = ttl
+        self.after_fork = after_fork
+        self.model = None
+        self.loaded = False
+        self.load_error = None
+        self.retry_at = 0.0
+        self.load_seconds = None
+        self.rss_bytes = None
+        self.loaded_at = None
+        self.last_used = None
+        self.lock = threading.Lock()
+
+
+class ModelRegistry:
+    """
+    Central place for the app's ML models.
+
+    Models are registered with a loader and built on first use (or during an
+    explicit warm_up), can be switched off with DISABLED_MODELS, and are
+    dropped again after MODEL_IDLE_TTL seconds without use. A loader that
+    fails is tried again on the first use after MODEL_LOAD_RETRY seconds.
+    """
+
+    def __init__(self, disabled: Iterable[str] = (), idle_ttl: float = 0, load_retry: float = 60):
+        self.disabled = {name.strip() for name in disabled if name.strip()}
+        self.idle_ttl = idle_ttl
+        self.load_retry = load_retry
+        self._entries: Dict[str, _Entry] = {}
+        self._reaper = None
+
+    def register(self, name: str, loader: Callable[[], Any], ttl: Optional[float] = None,
+                 after_fork: Optional[Callable[[Any], None]] = None):
+        """
+        Register a model loader.
+
+        `ttl` overrides the registry-wide idle TTL. `after_fork` is called with
+        the loaded model in each forked child, for models holding state that
+        must not be shared with the parent.
+        """
+        if name not in self._entries:
+            self._entries[name] = _Entry(name, loader, ttl, after_fork)
+
+    def is_enabled(self, name: str) -> bool:
+        return name in self._entries and name not in self.disabled
+
+    def get(self, name: str) -> Any:
+        """
+        Return the model, loading it if needed; None if disabled or its last
+        load failed less than `load_retry` seconds ago.
+        """
+        entry = self._entries.get(name)
+        if entry is None:
+            raise KeyError(f"Unknown model: {name}")
+        if name in self.disabled:
+            return None
+
+        # Read under the lock so an idle unload can't clear it in between
+        with entry.lock:
+            if not entry.loaded and time.time() >= entry.retry_at:
+                self._load(entry)
+            entry.last_used = time.time()
+            return entry.model
+
+    def _load(self, entry: _Entry):
+        rss_before = _current_rss()
+        started = time.perf_counter()
+        try:
+            entry.model = entry.loader()
+            entry.load_error = None
+        except Exception as e:
+            # Transient failures (OOM, a download timing out) should not
+            # disable the model for the life of the process
+            entry.model = None
+            entry.load_error = str(e)
+            entry.retry_at = time.time() + self.load_retry
+            entry.load_seconds = round(time.perf_counter() - started, 3)
+            return
+        entry.load_seconds = round(time.perf_counter() - started, 3)
+        rss_after = _current_rss()
+        entry.rss_bytes = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+        entry.loaded = True
+        entry.retry_at = 0.0
+        entry.loaded_at = time.time()
+        self._start_reaper()
+
+    def warm_up(self, names: Iterable[str] = None) -> Dict[str, Any]:
+        """Load the given models (all enabled ones by default) and return their status."""
+        names = list(self._entries) if names is None else [n for n in names if n in self._entries]
+        for name in names:
+            self.get(name)
+        return self.status()
+
+    @staticmethod
+    def _clear(entry: _Entry):
+        entry.model = None
+        entry.loaded = False
+        entry.rss_bytes = None
+
+    def unload(self, name: str):
+        entry = self._entries.get(name)
+        if entry is None or not entry.loaded:
+            return
+        with entry.lock:
+            self._clear(entry)
+        gc.collect()
+
+    def unload_idle(self) -> list:
+        """Unload every model that has been idle longer than its TTL."""
+        unloaded = []
+        for entry in self._entries.values():
+            ttl = entry.ttl if entry.ttl is not None else self.idle_ttl
+            if not ttl or not entry.loaded:
+                continue
+            with entry.lock:
+                # Checked again under the lock: a get() may have just used it
+                if entry.loaded and entry.last_used and time.time() - entry.last_used > ttl:
+                    self._clear(entry)
+                    unloaded.append(entry.name)
+        if unloaded:
+            gc.collect()
+        return unloaded
+
+    def _start_reaper(self):
+        has_ttl = self.idle_ttl or any(e.ttl for e in self._entries.values())
+        has_loaded = any(e.loaded for e in self._entries.values())
+        if not has_ttl or not has_loaded or (self._reaper is not None and self._reaper.is_alive()):
+            return
+
+        def reap():
+            while True:
+                time.sleep(30)
+                self.unload_idle()
+
+        self._reaper = threading.Thread(target=reap, name="model-idle-reaper", daemon=True)
+        self._reaper.start()
+
+    def freeze(self):
+        """
+        Prepare loaded models to be shared with forked workers.
+
+        Moves everything allocated so far into the GC's permanent generation so
+        collections in the children don't write to (and so copy) the pages
+        holding model objects.
+        """
+        gc.collect()
+        gc.freeze()
+
+    def _after_fork(self):
+        # Locks may have been held by another thread at fork time and the
+        # reaper thread does not exist in the child
+        for entry in self._entries.values():
+            entry.lock = threading.Lock()
+        self._reaper = None
+        _reset_torch_threads()
+
+        for entry in self._entries.values():
+            if entry.after_fork and entry.model is not None:
+                try:
+                    entry.after_fork(entry.model)
+                except Exception as e:
+                    entry.load_error = f"after_fork failed: {e}"
+        self._start_reaper()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            name: {
+                "enabled": name not in self.disabled,
+                "loaded": entry.loaded and entry.model is not None,
+                "loadError": entry.load_error,
+                "loadSeconds": entry.load_seconds,
+                "residentBytes": entry.rss_bytes,
+                "loadedAt": entry.loaded_at,
+                "lastUsed": entry.last_used
+            }
+            for name, entry in self._entries.items()
+        }
+
+
+# Global instance
+model_registry = ModelRegistry(
+    disabled=os.getenv("DISABLED_MODELS", "").split(","),
+    idle_ttl=float(os.getenv("MODEL_IDLE_TTL", 0)),
+    load_retry=float(os.getenv("MODEL_LOAD_RETRY", 60))
+)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=model_registry._after_fork)
@@ -1,43 +1,419 @@
 from paddleocr import PaddleOCR
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+import multiprocessing
 import os
+import threading
+import time
+from typing import Dict, Iterator, List, Tuple, Union
 
-_ocr = None
+import numpy as np
+
+from utils.image_preprocess import preprocess_image, to_bgr
+from utils.model_registry import model_registry
+from utils.ocr_cache import OCRCache
+
+OCR_LANG = 'en'
+OCR_USE_TEXTLINE_ORIENTATION = True
+OCR_MIN_CONFIDENCE = 0.5  # Only include high confidence detections
+
+OCR_CACHE_ENABLED = os.getenv('OCR_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+OCR_CACHE_DIR = os.getenv('OCR_CACHE_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'ocr_cache'))
+OCR_CACHE_MAX_MB = int(os.getenv('OCR_CACHE_MAX_MB', 256))
+
+# Preprocessing before OCR (see utils/image_preprocess.py). OCR_MAX_LONG_EDGE=0
+# keeps full resolution; OCR_PREPROCESS=false hands PaddleOCR the raw file
+OCR_PREPROCESS = os.getenv('OCR_PREPROCESS', 'true').lower() in ('1', 'true', 'yes')
+OCR_MAX_LONG_EDGE = int(os.getenv('OCR_MAX_LONG_EDGE', 2000))
+OCR_GRAYSCALE = os.getenv('OCR_GRAYSCALE', 'true').lower() in ('1', 'true', 'yes')
+OCR_DESKEW = os.getenv('OCR_DESKEW', 'false').lower() in ('1', 'true', 'yes')
+OCR_AUTO_CROP = os.getenv('OCR_AUTO_CROP', 'false').lower() in ('1', 'true', 'yes')
+
+# Worker processes of the shared OCR pool, started once and reused by every
+# batch and PDF; each call limits its own share with max_workers
+OCR_POOL_WORKERS = int(os.getenv('OCR_POOL_WORKERS', os.cpu_count() or 1))
+
+# PDF receipts and invoices. Pages are rendered one at a time and up to
+# OCR_PDF_WORKERS of them are OCRed at once; at most OCR_PDF_MAX_BITMAPS
+# rendered pages are held in memory (or in OCR) at once, even when there
+# are more workers
+PDF_RENDER_SCALE = float(os.getenv('PDF_RENDER_SCALE', 2))
+OCR_PDF_MAX_PAGES = int(os.getenv('OCR_PDF_MAX_PAGES', 50))
+OCR_PDF_WORKERS = int(os.getenv('OCR_PDF_WORKERS', 2))
+OCR_PDF_MAX_BITMAPS = int(os.getenv('OCR_PDF_MAX_BITMAPS', 4))
+
+_cache = None
+_pool = None
+_pool_lock = threading.Lock()
+
+model_registry.register(
+    "paddle_ocr",
+    lambda: PaddleOCR(use_textline_orientation=OCR_USE_TEXTLINE_ORIENTATION, lang=OCR_LANG)
+)
 
 def _get_ocr():
-    global _ocr
-    if _ocr is None:
-        _ocr = PaddleOCR(use_textline_orientation=True, lang='en')
-    return _ocr
+    ocr = model_registry.get("paddle_ocr")
+    if ocr is None:
+        error = model_registry.status()["paddle_ocr"]["loadError"]
+        raise RuntimeError(error or "PaddleOCR is disabled (DISABLED_MODELS)")
+    return ocr
+
+def get_ocr_cache():
+    """The OCR result cache, or None when disabled with OCR_CACHE_ENABLED=false."""
+    global _cache
+    if _cache is None and OCR_CACHE_ENABLED:
+        _cache = OCRCache(OCR_CACHE_DIR, OCR_CACHE_MAX_MB * 1024 * 1024)
+    return _cache
+
+def _preprocess_config() -> dict:
+    if not OCR_PREPROCESS:
+        return {}
+    return {
+        "max_long_edge": OCR_MAX_LONG_EDGE,
+        "grayscale": OCR_GRAYSCALE,
+        "deskew_image": OCR_DESKEW,
+        "crop": OCR_AUTO_CROP
+    }
+
+def _ocr_config() -> dict:
+    # Preprocessing changes the OCR output, so it is part of the cache key
+    return {
+        "lang": OCR_LANG,
+        "use_textline_orientation": OCR_USE_TEXTLINE_ORIENTATION,
+        "min_confidence": OCR_MIN_CONFIDENCE,
+        "preprocess": _preprocess_config()
+    }
+
+def _pdf_config() -> dict:
+    return {"render_scale": PDF_RENDER_SCALE, "max_pages": OCR_PDF_MAX_PAGES}
+
+def is_pdf(path: str) -> bool:
+    return path.lower().endswith('.pdf')
+
+def _page_cache_key(image: np.ndarray) -> str:
+    # Keyed by the rendered bitmap, so a page hits the cache whichever PDF
+    # (or re-upload of the same PDF) it comes from
+    config = _ocr_config()
+    config["page_shape"] = list(image.shape)
+    return OCRCache.make_key(np.ascontiguousarray(image).tobytes(), config)
+
+def _cache_key(path: str) -> str:
+    config = _ocr_config()
+    if is_pdf(path):
+        config["pdf"] = _pdf_config()
+    with open(path, 'rb') as f:
+        return OCRCache.make_key(f.read(), config)
+
+def _recognize_lines(image: Union[str, np.ndarray]) -> Tuple[list, Dict[str, float]]:
+    """
+    Run PaddleOCR on an image file, or on an already rendered page array,
+    and return its recognized lines as groups of [text, score] pairs (each
+    group becomes one line of output text), plus the milliseconds spent in
+    each preprocessing stage and in OCR.
+    """
+    ocr = _get_ocr()
+    config = _preprocess_config()
+    if not isinstance(image, str):
+        image, timings = to_bgr(image), {}
+    elif config:
+        image, timings = preprocess_image(image, **config)
+    else:
+        timings = {}
+
+    start = time.perf_counter()
+    result = ocr.ocr(image)
+    timings["ocr"] = round((time.perf_counter() - start) * 1000, 2)
+
+    groups = []
+    if result and isinstance(result[0], dict):
+        # New PaddleOCR API
+        rec_texts = result[0].get('rec_texts', [])
+        rec_scores = result[0].get('rec_scores', [])
+        for text, score in zip(rec_texts, rec_scores):
+            groups.append([[text, float(score)]])
+    else:
+        # Old API fallback
+        for line in result:
+            groups.append([[word_info[1][0], float(word_info[1][1])] for word_info in line])
+    return groups, timings
+
+def _lines_to_text(groups: list) -> str:
+    text_lines = []
+    for group in groups:
+        line_text = [text for text, score in group if score > OCR_MIN_CONFIDENCE]
+        if line_text:
+            text_lines.append(' '.join(line_text))
+    text = '\n'.join(text_lines)
+    return text.strip()
+
+_timing_lock = threading.Lock()
+_stage_timings: Dict[str, Dict[str, float]] = {}
+
+def _record_timings(timings: Dict[str, float]):
+    with _timing_lock:
+        for stage, ms in timings.items():
+            stats = _stage_timings.setdefault(stage, {"count": 0, "totalMs": 0.0, "maxMs": 0.0})
+            stats["count"] += 1
+            stats["totalMs"] += ms
+            stats["maxMs"] = max(stats["maxMs"], ms)
+
+def get_ocr_timings() -> Dict[str, Dict[str, float]]:
+    """Per-stage call count, average and maximum milliseconds of the OCR runs in this process."""
+    with _timing_lock:
+        return {
+            stage: {
+                "count": stats["count"],
+                "avgMs": round(stats["totalMs"] / stats["count"], 2),
+                "maxMs": round(stats["maxMs"], 2)
+            }
+            for stage, stats in _stage_timings.items()
+        }
+
+def _render_page(pdf, index: int) -> Tuple[np.ndarray, float]:
+    """Render one PDF page to a grayscale (or BGR) array no larger than OCR_MAX_LONG_EDGE."""
+    start = time.perf_counter()
+    page = pdf[index]
+    try:
+        scale = PDF_RENDER_SCALE
+        if OCR_PREPROCESS and OCR_MAX_LONG_EDGE:
+            scale = min(scale, OCR_MAX_LONG_EDGE / max(page.get_size()))
+        bitmap = page.render(scale=scale, grayscale=OCR_PREPROCESS and OCR_GRAYSCALE)
+        try:
+            # to_numpy() is a view of pdfium's buffer, which close() frees
+            array = bitmap.to_numpy().copy()
+        finally:
+            bitmap.close()
+    finally:
+        page.close()
+    return array, round((time.perf_counter() - start) * 1000, 2)
+
+def _completed(fn, *args) -> Future:
+    future = Future()
+    try:
+        future.set_result(fn(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+def iter_pdf_page_texts(pdf_path: str, max_workers: int = None,
+                        max_bitmaps: int = None) -> Iterator[Tuple[int, str]]:
+    """
+    OCR a PDF and yield (page_number, text) for each page in order, as soon
+    as that page is done.
+
+    Pages are rendered lazily in this process, one at a time (pdfium is not
+    thread-safe), and OCRed on the shared pool, at most `max_workers` at
+    once; rendering stops while `max_bitmaps` pages are waiting, in OCR or
+    not yet yielded, so with fewer bitmaps than workers fewer pages run. Each rendered
+    page goes through the OCR cache like an uploaded image. Only the first
+    OCR_PDF_MAX_PAGES pages are read.
+    """
+    import pypdfium2 as pdfium  # only needed for PDF uploads
+
+    cache = get_ocr_cache()
+    pdf = pdfium.PdfDocument(pdf_path)
+    in_flight = deque()
+    try:
+        page_count = min(len(pdf), OCR_PDF_MAX_PAGES)
+        max_workers = max(1, min(max_workers or OCR_PDF_WORKERS, page_count))
+        max_bitmaps = max(1, max_bitmaps or OCR_PDF_MAX_BITMAPS)
+        if max_workers == 1 or max_bitmaps == 1:
+            # Nothing to overlap: OCR in this process, one page per render
+            pool, max_bitmaps = None, 1
+        else:
+            pool = _get_pool()
+
+        next_page = 0
+        page_number = 0
+        while next_page < page_count or in_flight:
+            while (next_page < page_count and len(in_flight) < max_bitmaps
+                   and _running(in_flight) < max_workers):
+                image, render_ms = _render_page(pdf, next_page)
+                _record_timings({"pdf_render": render_ms})
+                key = _page_cache_key(image) if cache else None
+                entry = cache.get(key) if cache else None
+                if entry is not None:
+                    in_flight.append((_completed(lambda: (entry["lines"], {})), None))
+                elif pool is None:
+                    in_flight.append((_completed(_recognize_lines_task, image), key))
+                else:
+                    in_flight.append((pool.submit(_recognize_lines_task, image), key))
+                del image
+                next_page += 1
+
+            page_number += 1
+            future, key = in_flight.popleft()
+            try:
+                groups, timings = future.result()
+            except Exception as e:
+                raise RuntimeError(f"Page {page_number}: {str(e)}")
+            _record_timings(timings)
+            text = _lines_to_text(groups)
+            if key is not None:
+                cache.put(key, {"text": text, "lines": groups})
+            yield page_number, text
+    finally:
+        # Stopped early (error or abandoned generator): drop queued pages
+        for future, _ in in_flight:
+            future.cancel()
+        pdf.close()
+
+def _running(in_flight) -> int:
+    return sum(1 for future, _ in in_flight if not future.done())
+
+def _ocr_pdf(pdf_path: str, max_workers: int = None) -> Tuple[str, List[str]]:
+    try:
+        pages = [text for _, text in iter_pdf_page_texts(pdf_path, max_workers=max_workers)]
+    except Exception as e:
+        raise RuntimeError(f"PDF OCR processing failed: {str(e)}")
+    return '\n\n'.join(page for page in pages if page), pages
+
+def extract_text_from_pdf(pdf_path: str, max_workers: int = None) -> str:
+    """Extract the text of every page of a PDF, pages separated by a blank line."""
+    if not os.path.exists(pdf_path):
+        raise FileNotFoundError(f"File not found: {pdf_path}")
+
+    cache = get_ocr_cache()
+    key = _cache_key(pdf_path) if cache else None
+    if cache:
+        entry = cache.get(key)
+        if entry is not None:
+            return entry["text"]
+
+    text, pages = _ocr_pdf(pdf_path, max_workers)
+    if cache:
+        cache.put(key, {"text": text, "pages": pages})
+    return text
+
+def extract_text(path: str) -> str:
+    """Extract text from an uploaded receipt, image or PDF."""
+    if is_pdf(path):
+        return extract_text_from_pdf(path)
+    return extract_text_from_image(path)
 
 def extract_text_from_image(image_path: str) -> str:
     """Extract text from an image file using Paddle OCR."""
     if not os.path.exists(image_path):
         raise FileNotFoundError(f"File not found: {image_path}")
 
+    cache = get_ocr_cache()
+    key = _cache_key(image_path) if cache else None
+    if cache:
+        entry = cache.get(key)
+        if entry is not None:
+            return entry["text"]
+
     try:
-        ocr = _get_ocr()
-        result = ocr.ocr(image_path)
-        text_lines = []
-        if result and isinstance(result[0], dict):
-            # New PaddleOCR API
-            rec_texts = result[0].get('rec_texts', [])
-            rec_scores = result[0].get('rec_scores', [])
-            for text, score in zip(rec_texts, rec_scores):
-                if score > 0.5:  # Only include high confidence detections
-                    text_lines.append(text)
-        else:
-            # Old API fallback
-            for line in result:
-                line_text = []
-                for word_info in line:
-                    text, confidence = word_info[1]
-                    if confidence > 0.5:
-                        line_text.append(text)
-                if line_text:
-                    text_lines.append(' '.join(line_text))
-        text = '\n'.join(text_lines)
-        return text.strip()
+        groups, timings = _recognize_lines(image_path)
     except Exception as e:
         raise RuntimeError(f"OCR processing failed: {str(e)}")
 
+    _record_timings(timings)
+    text = _lines_to_text(groups)
+    if cache:
+        cache.put(key, {"text": text, "lines": groups})
+    return text
+
+
+def _recognize_lines_task(image_path: str) -> Tuple[list, Dict[str, float]]:
+    try:
+        return _recognize_lines(image_path)
+    except Exception as e:
+        raise RuntimeError(f"OCR processing failed: {str(e)}")
+
+
+def _reset_after_fork():
+    # A forked child must not reuse the parent's pool handles or cache lock
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = threading.Lock()
+    if _cache is not None:
+        _cache._lock = threading.Lock()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """
+    The shared OCR_POOL_WORKERS-process pool, whose workers each keep their
+    own PaddleOCR instance via _get_ocr. It lives as long as the process and
+    is only replaced when a crashed worker has broken it.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None or getattr(_pool, "_broken", False):
+            # spawn, not fork: Paddle's thread pools don't survive being forked
+            _pool = ProcessPoolExecutor(max_workers=max(1, OCR_POOL_WORKERS),
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def extract_texts_from_images(image_paths: List[str], max_workers: int = None) -> List[Union[str, Exception]]:
+    """
+    OCR several images (or PDFs) in parallel on the shared pool of worker
+    processes, at most `max_workers` at once.
+
+    Cached images are answered in this process; only misses are sent to the
+    pool. Returns one entry per path, in order: the extracted text, or the
+    exception raised for that file so one bad image doesn't fail the whole
+    batch.
+    """
+    if not image_paths:
+        return []
+
+    cache = get_ocr_cache()
+    results = [None] * len(image_paths)
+    keys = [None] * len(image_paths)
+    to_run = []
+
+    for i, path in enumerate(image_paths):
+        if not os.path.exists(path):
+            results[i] = FileNotFoundError(f"File not found: {path}")
+            continue
+        if cache:
+            keys[i] = _cache_key(path)
+            entry = cache.get(keys[i])
+            if entry is not None:
+                results[i] = entry["text"]
+                continue
+        to_run.append(i)
+
+    pdfs = [i for i in to_run if is_pdf(image_paths[i])]
+    images = [i for i in to_run if not is_pdf(image_paths[i])]
+    max_workers = max(1, max_workers or min(len(to_run), OCR_POOL_WORKERS))
+
+    def collect(i, future):
+        try:
+            groups, timings = future.result()
+        except Exception as e:
+            results[i] = e
+            return
+        # Measured in the worker process, aggregated here
+        _record_timings(timings)
+        results[i] = _lines_to_text(groups)
+        if cache:
+            cache.put(keys[i], {"text": results[i], "lines": groups})
+
+    if images:
+        pool = _get_pool()
+        in_flight = deque()
+        for i in images:
+            # Keep at most max_workers images queued on the shared pool
+            if len(in_flight) >= max_workers:
+                collect(*in_flight.popleft())
+            in_flight.append((i, pool.submit(_recognize_lines_task, image_paths[i])))
+        while in_flight:
+            collect(*in_flight.popleft())
+
+    # After the images, so the pages of each PDF are spread over the same pool
+    for i in pdfs:
+        try:
+            results[i], pages = _ocr_pdf(image_paths[i], max_workers)
+        except Exception as e:
+            results[i] = e
+            continue
+        if cache:
+            cache.put(keys[i], {"text": results[i], "pages": pages})
 
+    return results
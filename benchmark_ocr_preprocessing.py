@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+"""
+Accuracy/latency benchmark for the OCR preprocessing stage.
+
+    python benchmark_ocr_preprocessing.py receipts/*.jpg
+    python benchmark_ocr_preprocessing.py receipts/*.jpg --max-edges 0,1280,1600,2000,2500 --deskew --crop
+
+Runs PaddleOCR on every image with preprocessing off (the raw file, as
+before) and with each --max-edges setting, and prints the average
+preprocessing and OCR time per configuration together with the text
+similarity to a reference. The reference is <image>.txt next to the image
+when present (hand-checked ground truth), otherwise the OCR output of the
+unprocessed image.
+"""
+import argparse
+import difflib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+import utils.ocr as ocr
+
+
+def normalize(text):
+    return " ".join(text.lower().split())
+
+
+def similarity(text, reference):
+    return difflib.SequenceMatcher(None, normalize(text), normalize(reference)).ratio()
+
+
+def run_config(image_path, preprocess, max_long_edge, grayscale, deskew, crop):
+    ocr.OCR_PREPROCESS = preprocess
+    ocr.OCR_MAX_LONG_EDGE = max_long_edge
+    ocr.OCR_GRAYSCALE = grayscale
+    ocr.OCR_DESKEW = deskew
+    ocr.OCR_AUTO_CROP = crop
+
+    start = time.perf_counter()
+    groups, timings = ocr._recognize_lines(image_path)
+    total_ms = (time.perf_counter() - start) * 1000
+    return ocr._lines_to_text(groups), timings.get("ocr", 0.0), total_ms - timings.get("ocr", 0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark OCR accuracy and latency with and without preprocessing")
+    parser.add_argument("images", nargs="+", help="Receipt images")
+    parser.add_argument("--max-edges", default="1280,1600,2000,2500",
+                        help="Comma-separated long-edge limits to try (0 = full resolution)")
+    parser.add_argument("--color", action="store_true", help="Keep color instead of converting to grayscale")
+    parser.add_argument("--deskew", action="store_true", help="Also deskew")
+    parser.add_argument("--crop", action="store_true", help="Also auto-crop to the receipt")
+    args = parser.parse_args()
+
+    images = [path for path in args.images if os.path.isfile(path)]
+    if not images:
+        print("No images found")
+        sys.exit(1)
+
+    configs = [("raw file", False, 0)]
+    configs += [(f"long edge {edge or 'full'}", True, edge) for edge in map(int, args.max_edges.split(","))]
+
+    # Load the model before timing anything
+    ocr._get_ocr()
+
+    references = {}
+    rows = {label: {"ocr": [], "pre": [], "score": []} for label, _, _ in configs}
+    for path in images:
+        print(f"{os.path.basename(path)}")
+        for label, preprocess, edge in configs:
+            text, ocr_ms, pre_ms = run_config(path, preprocess, edge, not args.color, args.deskew, args.crop)
+            if path not in references:
+                truth_path = os.path.splitext(path)[0] + ".txt"
+                if os.path.exists(truth_path):
+                    with open(truth_path, encoding="utf-8") as f:
+                        references[path] = f.read()
+                else:
+                    references[path] = text
+            score = similarity(text, references[path])
+            rows[label]["ocr"].append(ocr_ms)
+            rows[label]["pre"].append(pre_ms)
+            rows[label]["score"].append(score)
+            print(f"  {label:18} preprocess {pre_ms:8.1f} ms  ocr {ocr_ms:8.1f} ms  similarity {score:.3f}")
+
+    print(f"\n{len(images)} image(s), averages:")
+    print(f"{'config':18} {'preprocess ms':>14} {'ocr ms':>10} {'total ms':>10} {'similarity':>11}")
+    for label, _, _ in configs:
+        stats = rows[label]
+        pre = sum(stats["pre"]) / len(images)
+        ocr_ms = sum(stats["ocr"]) / len(images)
+        score = sum(stats["score"]) / len(images)
+        print(f"{label:18} {pre:>14.1f} {ocr_ms:>10.1f} {pre + ocr_ms:>10.1f} {score:>11.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+"""
+Mixed read/write throughput of SQLite with and without the performance profile.
+
+    python benchmark_sqlite_profile.py
+    python benchmark_sqlite_profile.py --readers 6 --writers 2 --seconds 15
+
+Starts reader and writer processes (like gunicorn workers) against a
+temporary database file, once with SQLITE_PROFILE=default and once with
+SQLITE_PROFILE=performance. Readers run dashboard-style aggregate queries,
+writers insert expenses one transaction each. Prints operations per second
+and "database is locked" errors for both runs.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from utils.db_tuning import engine_options, sqlite_pragmas, apply_sqlite_pragmas
+
+CATEGORIES = ["Food", "Travel", "Office", "Utilities", "Other"]
+
+READ_QUERIES = [
+    "SELECT category, COUNT(*), SUM(amount) FROM expense GROUP BY category",
+    "SELECT strftime('%Y-%m', uploaded_at) AS month, SUM(amount) FROM expense GROUP BY month",
+    "SELECT * FROM expense ORDER BY uploaded_at DESC, id DESC LIMIT 50",
+]
+
+
+def make_engine(path, profile):
+    url = f"sqlite:///{path}"
+    engine = create_engine(url, **engine_options(url, sqlite_profile=profile))
+    if profile == "performance":
+        apply_sqlite_pragmas(engine, sqlite_pragmas())
+    return engine
+
+
+def setup(path, profile, rows):
+    engine = make_engine(path, profile)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE expense (id INTEGER PRIMARY KEY, vendor VARCHAR(255), category VARCHAR(100), "
+            "amount FLOAT, uploaded_at DATETIME)"
+        ))
+        conn.execute(text("CREATE INDEX ix_expense_uploaded_at_id ON expense (uploaded_at, id)"))
+        conn.execute(
+            text("INSERT INTO expense (vendor, category, amount, uploaded_at) "
+                 "VALUES (:vendor, :category, :amount, datetime('now', :offset))"),
+            [{"vendor": f"Vendor {i % 200}", "category": CATEGORIES[i % len(CATEGORIES)],
+              "amount": round(random.uniform(5, 500), 2), "offset": f"-{i % 365} days"}
+             for i in range(rows)]
+        )
+    engine.dispose()
+
+
+def worker(path, profile, role, seconds, results):
+    engine = make_engine(path, profile)
+    ops = errors = 0
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        try:
+            with engine.begin() as conn:
+                if role == "writer":
+                    conn.execute(
+                        text("INSERT INTO expense (vendor, category, amount, uploaded_at) "
+                             "VALUES (:vendor, :category, :amount, datetime('now'))"),
+                        {"vendor": "Benchmark", "category": random.choice(CATEGORIES),
+                         "amount": round(random.uniform(5, 500), 2)}
+                    )
+                else:
+                    conn.execute(text(random.choice(READ_QUERIES))).fetchall()
+            ops += 1
+        except OperationalError:
+            errors += 1
+    engine.dispose()
+    results.put((role, ops, errors))
+
+
+def run(profile, readers, writers, seconds, rows):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        setup(path, profile, rows)
+
+        results = multiprocessing.Queue()
+        roles = ["reader"] * readers + ["writer"] * writers
+        processes = [multiprocessing.Process(target=worker, args=(path, profile, role, seconds, results))
+                     for role in roles]
+        for p in processes:
+            p.start()
+        collected = [results.get() for _ in processes]
+        for p in processes:
+            p.join()
+
+    totals = {"reader": [0, 0], "writer": [0, 0]}
+    for role, ops, errors in collected:
+        totals[role][0] += ops
+        totals[role][1] += errors
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SQLite with the default and performance profiles")
+    parser.add_argument("--readers", type=int, default=4, help="Reader processes")
+    parser.add_argument("--writers", type=int, default=2, help="Writer processes")
+    parser.add_argument("--seconds", type=float, default=10, help="Duration of each run")
+    parser.add_argument("--rows", type=int, default=20000, help="Expenses seeded before each run")
+    args = parser.parse_args()
+
+    print(f"{args.readers} readers, {args.writers} writers, {args.seconds:g}s per run, {args.rows} seeded rows\n")
+    print(f"{'profile':12} {'reads/s':>10} {'writes/s':>10} {'read errors':>12} {'write errors':>13}")
+    for profile in ("default", "performance"):
+        totals = run(profile, args.readers, args.writers, args.seconds, args.rows)
+        reads, read_errors = totals["reader"]
+        writes, write_errors = totals["writer"]
+        print(f"{profile:12} {reads / args.seconds:>10.1f} {writes / args.seconds:>10.1f} "
+              f"{read_errors:>12} {write_errors:>13}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+"""
+Measure per-worker memory of the gunicorn backend (Linux only).
+
+    python measure_worker_memory.py --pid <gunicorn master pid>
+    python measure_worker_memory.py --compare --workers 4
+
+--compare starts gunicorn twice, with and without GUNICORN_PRELOAD, with all
+models warmed up in both runs, and prints RSS/PSS for each process. PSS
+splits shared pages between the processes mapping them, so the PSS total is
+the real memory cost of the deployment.
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+
+
+def read_memory(pid):
+    """RSS, PSS and shared bytes for a process from /proc/<pid>/smaps_rollup."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[2] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    shared = values.get("Shared_Clean", 0) + values.get("Shared_Dirty", 0)
+    return {"rss": values.get("Rss", 0), "pss": values.get("Pss", 0), "shared": shared}
+
+
+def child_pids(pid):
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            if int(fields[1]) == pid:
+                children.append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+    return sorted(children)
+
+
+def mb(n):
+    return f"{n / (1024 * 1024):8.1f} MB"
+
+
+def report(master_pid, label=""):
+    rows = [("master", master_pid)] + [(f"worker {i + 1}", pid) for i, pid in enumerate(child_pids(master_pid))]
+    totals = {"rss": 0, "pss": 0}
+
+    print(f"\n{label or f'gunicorn master {master_pid}'}")
+    print(f"  {'process':<10} {'pid':>7} {'RSS':>11} {'PSS':>11} {'shared':>11}")
+    for name, pid in rows:
+        mem = read_memory(pid)
+        totals["rss"] += mem["rss"]
+        totals["pss"] += mem["pss"]
+        print(f"  {name:<10} {pid:>7} {mb(mem['rss'])} {mb(mem['pss'])} {mb(mem['shared'])}")
+    print(f"  {'total':<10} {'':>7} {mb(totals['rss'])} {mb(totals['pss'])}")
+    return totals
+
+
+def run_gunicorn(preload, workers, port, settle):
+    env = dict(os.environ,
+               GUNICORN_PRELOAD="1" if preload else "0",
+               MODEL_WARMUP="all",
+               WEB_CONCURRENCY=str(workers),
+               PORT=str(port))
+    proc = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+                            cwd=BACKEND_DIR, env=env)
+
+    # Wait until every worker has forked and finished importing (and so loading models)
+    deadline = time.time() + settle
+    while time.time() < deadline and len(child_pids(proc.pid)) < workers:
+        time.sleep(1)
+    time.sleep(min(settle, 30) if not preload else 5)
+    return proc
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pid", type=int, help="PID of a running gunicorn master")
+    parser.add_argument("--compare", action="store_true", help="Start gunicorn with and without preload and compare")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--settle", type=int, default=180, help="Seconds to wait for workers to load models")
+    args = parser.parse_args()
+
+    if args.pid:
+        report(args.pid)
+        return
+
+    if not args.compare:
+        parser.error("pass --pid or --compare")
+
+    results = {}
+    for preload in (False, True):
+        proc = run_gunicorn(preload, args.workers, args.port, args.settle)
+        try:
+            label = "preload (shared copy-on-write)" if preload else "no preload (per-worker models)"
+            results[preload] = report(proc.pid, label)
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(timeout=60)
+
+    saved = results[False]["pss"] - results[True]["pss"]
+    print(f"\nPSS saved by preloading with {args.workers} workers: {mb(saved).strip()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+"""
+Local mock of the Baidu ERNIE API for load testing the async client.
+
+    python mock_ernie_server.py --port 8600
+    python mock_ernie_server.py --load 200 --rate 20 --max-in-flight 8
+
+The server answers the OAuth token and chat endpoints after a random
+latency. It enforces its own QPS limit with 429 responses and fails a share
+of requests with 503, like the real provider under load.
+
+--load N starts the server in-process and sends N prompts through
+AsyncErnieClient at once. It then prints throughput and latency, plus
+what the server saw: peak concurrent requests, peak requests in one
+second, and how many were rejected.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from aiohttp import web
+
+from ai_agents.async_ernie_client import AsyncErnieClient
+
+
+class MockErnieServer:
+    def __init__(self, latency: float, qps_limit: float, error_rate: float):
+        self.latency = latency
+        self.qps_limit = qps_limit
+        self.error_rate = error_rate
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.recent = []
+        self.peak_qps = 0
+        self.counts = {"ok": 0, "rate_limited": 0, "errors": 0, "tokens": 0}
+
+    async def token(self, request):
+        self.counts["tokens"] += 1
+        return web.json_response({"access_token": f"mock-token-{self.counts['tokens']}", "expires_in": 2592000})
+
+    async def chat(self, request):
+        payload = await request.json()
+        now = time.monotonic()
+        self.recent = [t for t in self.recent if now - t < 1.0]
+        self.recent.append(now)
+        self.peak_qps = max(self.peak_qps, len(self.recent))
+        if self.qps_limit and len(self.recent) > self.qps_limit:
+            self.counts["rate_limited"] += 1
+            return web.json_response({"error_code": 18, "error_msg": "Open api qps request limit reached"},
+                                     status=429)
+
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(random.uniform(0.5, 1.5) * self.latency)
+            if random.random() < self.error_rate:
+                self.counts["errors"] += 1
+                return web.json_response({"error": "service unavailable"}, status=503)
+
+            self.counts["ok"] += 1
+            return web.json_response({"result": f"mock answer to {len(payload['messages'][0]['content'])} chars"})
+        finally:
+            self.in_flight -= 1
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/oauth/2.0/token", self.token)
+        app.router.add_post("/rpc/2.0/ai_custom/v1/wenxinworkshop/chat/{model}", self.chat)
+        return app
+
+
+async def load_test(server: MockErnieServer, args):
+    runner = web.AppRunner(server.app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", args.port)
+    await site.start()
+
+    client = AsyncErnieClient("key", "secret", base_url=f"http://127.0.0.1:{args.port}",
+                              rate_per_second=args.rate, burst=args.burst, max_in_flight=args.max_in_flight,
+                              request_timeout=args.timeout, max_retries=args.retries)
+    latencies = []
+    failures = 0
+
+    async def call(i):
+        nonlocal failures
+        start = time.perf_counter()
+        try:
+            await client.generate_response(f"Load test prompt {i}")
+            latencies.append(time.perf_counter() - start)
+        except Exception:
+            failures += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(call(i) for i in range(args.load)))
+    elapsed = time.perf_counter() - started
+
+    await client.close()
+    await runner.cleanup()
+
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies else 0.0
+
+    print(f"{args.load} calls, rate limit {args.rate}/s, max in flight {args.max_in_flight}")
+    print(f"  finished in {elapsed:.2f}s ({len(latencies) / elapsed:.1f} successful calls/s), {failures} failed")
+    print(f"  latency p50 {percentile(0.5):.3f}s  p95 {percentile(0.95):.3f}s  max {percentile(1.0):.3f}s")
+    print(f"  server: peak {server.peak_in_flight} in flight, peak {server.peak_qps} requests/s, "
+          f"{server.counts['rate_limited']} rate limited, {server.counts['errors']} errors, "
+          f"{server.counts['tokens']} token request(s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock ERNIE API server and async client load test")
+    parser.add_argument("--port", type=int, default=8600, help="Port to listen on")
+    parser.add_argument("--latency", type=float, default=0.2, help="Mean seconds per chat response")
+    parser.add_argument("--qps-limit", type=float, default=25, help="Server-side QPS before 429s (0 = none)")
+    parser.add_argument("--error-rate", type=float, default=0.02, help="Share of chat calls failing with 503")
+    parser.add_argument("--load", type=int, default=0, help="Run a load test with this many calls")
+    parser.add_argument("--rate", type=float, default=20, help="Client rate limit (requests/s) for --load")
+    parser.add_argument("--burst", type=float, default=None, help="Client burst size for --load (default 1)")
+    parser.add_argument("--max-in-flight", type=int, default=8, help="Client concurrency limit for --load")
+    parser.add_argument("--timeout", type=float, default=5, help="Client per-attempt timeout for --load")
+    parser.add_argument("--retries", type=int, default=3, help="Client retries for --load")
+    args = parser.parse_args()
+
+    server = MockErnieServer(args.latency, args.qps_limit, args.error_rate)
+    if args.load:
+        asyncio.run(load_test(server, args))
+    else:
+        print(f"Mock ERNIE API on http://127.0.0.1:{args.port}")
+        web.run_app(server.app(), host="127.0.0.1", port=args.port, print=None)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from app import app, db, migrate_database, rebuild_category_stats, rebuild_vendors, CategoryStats, Vendor
+
+
+def main():
+    with app.app_context():
+        db.create_all()
+        migrate_database()
+
+        print("Rebuilding per-category amount statistics from the expense table...\n")
+        categories = rebuild_category_stats()
+
+        for stats in CategoryStats.query.order_by(CategoryStats.category).all():
+            print(f"  {stats.category}: n={stats.count} mean=${stats.mean:.2f} "
+                  f"std=${stats.std_dev:.2f} min=${stats.min_amount:.2f} max=${stats.max_amount:.2f}")
+
+        print(f"\n[OK] Rebuilt statistics for {categories} categories")
+
+        print("\nRebuilding vendor dimension from the expense table...")
+        vendors = rebuild_vendors()
+        top = Vendor.query.order_by(Vendor.occurrence_count.desc()).limit(5).all()
+        for vendor in top:
+            print(f"  {vendor.display_name}: {vendor.occurrence_count} transaction(s)")
+
+        print(f"\n[OK] Rebuilt {vendors} vendors")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+import argparse
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from app import app, db, migrate_database, rebuild_monthly_rollup, check_monthly_rollup, MonthlyRollup
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill or verify the monthly (month, category) rollup table")
+    parser.add_argument("--check", action="store_true",
+                        help="Only compare the rollup with the expense table and report differences")
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        migrate_database()
+
+        if args.check:
+            print("Checking monthly rollup against the expense table...\n")
+            mismatches = check_monthly_rollup()
+            for m in mismatches:
+                print(f"  {m['month']} {m['category']}: "
+                      f"expected total/count/flagged/flaggedAmount={m['expected']} stored={m['stored']}")
+
+            if mismatches:
+                print(f"\n[FAIL] {len(mismatches)} month/category row(s) out of date; run without --check to rebuild")
+                sys.exit(1)
+            print("[OK] Monthly rollup is consistent")
+            return
+
+        print("Rebuilding monthly rollup from the expense table...\n")
+        rows = rebuild_monthly_rollup()
+
+        for row in MonthlyRollup.query.order_by(MonthlyRollup.month, MonthlyRollup.category).all():
+            print(f"  {row.month} {row.category}: {row.expense_count} expense(s) ${row.total_amount:.2f}, "
+                  f"{row.flagged_count} flagged ${row.flagged_amount:.2f}")
+
+        print(f"\n[OK] Rebuilt {rows} month/category rows")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+"""
+Tests for AsyncErnieClient's limits against a local aiohttp stub of the Baidu API.
+
+The stub serves the OAuth token and chat endpoints on 127.0.0.1 inside the
+test's event loop and records when each chat request arrives and how many
+are open at once, so rate spacing, the in-flight cap, timeouts and session
+cleanup are checked without network access or credentials.
+
+    python test_async_ernie_client.py
+"""
+import asyncio
+import gc
+import sys
+import time
+import warnings
+
+sys.path.insert(0, 'backend')
+
+from aiohttp import web
+
+from ai_agents.async_ernie_client import AsyncErnieClient
+
+
+class StubBaidu:
+    """Stand-in for aip.baidubce.com with a configurable chat latency."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.token_requests = 0
+        self.chat_requests = 0
+        self.chat_started = []
+        self.chat_failures = []  # status codes for the next chat calls
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.dropped = 0
+        self.runner = None
+        self.url = None
+
+    async def token(self, request):
+        self.token_requests += 1
+        return web.json_response({"access_token": f"token-{self.token_requests}", "expires_in": 2592000})
+
+    async def chat(self, request):
+        payload = await request.json()
+        self.chat_requests += 1
+        self.chat_started.append(time.monotonic())
+        if self.chat_failures:
+            return web.json_response({"error": "failed"}, status=self.chat_failures.pop(0))
+
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+        if request.transport is None or request.transport.is_closing():
+            self.dropped += 1
+        return web.json_response({"result": f"echo: {payload['messages'][0]['content']}"})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/oauth/2.0/token", self.token)
+        app.router.add_post("/rpc/2.0/ai_custom/v1/wenxinworkshop/chat/{model}", self.chat)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = self.runner.addresses[0][1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self
+
+    async def close(self):
+        await self.runner.cleanup()
+
+
+def make_client(stub, **kwargs):
+    options = {"base_url": stub.url, "rate_per_second": 1000, "backoff_base": 0.01, "backoff_max": 0.05}
+    options.update(kwargs)
+    return AsyncErnieClient("key", "secret", **options)
+
+
+async def _rate_spacing():
+    stub = await StubBaidu().start()
+    try:
+        client = make_client(stub, rate_per_second=20)
+        prompts = [f"p{i}" for i in range(8)]
+        results = await asyncio.gather(*(client.generate_response(p) for p in prompts))
+        assert results == [f"echo: {p}" for p in prompts]
+
+        gaps = [b - a for a, b in zip(stub.chat_started, stub.chat_started[1:])]
+        assert min(gaps) >= 0.04, f"requests closer than the 20/s limit allows: {gaps}"
+        await client.close()
+    finally:
+        await stub.close()
+
+
+async def _in_flight_cap():
+    stub = await StubBaidu(latency=0.1).start()
+    try:
+        client = make_client(stub, max_in_flight=3)
+        await asyncio.gather(*(client.generate_response(f"p{i}") for i in range(10)))
+        assert stub.chat_requests == 10
+        assert stub.peak_in_flight == 3, f"expected 3 requests in flight, saw {stub.peak_in_flight}"
+        await client.close()
+    finally:
+        await stub.close()
+
+
+async def _timeout_cancels_attempt():
+    stub = await StubBaidu(latency=0.5).start()
+    try:
+        client = make_client(stub, request_timeout=0.2, max_retries=2)
+        started = time.monotonic()
+        try:
+            await client.generate_response("too late")
+            raise AssertionError("expected a timeout")
+        except asyncio.TimeoutError:
+            pass
+        assert time.monotonic() - started < 0.4
+        # A chat that timed out may already have been generated: no retry
+        assert stub.chat_requests == 1
+
+        await asyncio.sleep(0.4)
+        assert stub.dropped == 1, "the timed out request's connection was not dropped"
+        await client.close()
+    finally:
+        await stub.close()
+
+
+async def _retries_only_safe_chat_statuses():
+    stub = await StubBaidu().start()
+    try:
+        client = make_client(stub, max_retries=3)
+        stub.chat_failures = [429, 503, 502]
+        assert await client.generate_response("retry") == "echo: retry"
+        assert stub.chat_requests == 4
+
+        stub.chat_failures = [500]
+        try:
+            await client.generate_response("once")
+            raise AssertionError("expected the 500 to be returned")
+        except Exception as e:
+            assert "ERNIE API error" in str(e)
+        assert stub.chat_requests == 5
+        await client.close()
+    finally:
+        await stub.close()
+
+
+def test_rate_spacing():
+    asyncio.run(_rate_spacing())
+
+
+def test_in_flight_cap():
+    asyncio.run(_in_flight_cap())
+
+
+def test_timeout_cancels_attempt():
+    asyncio.run(_timeout_cancels_attempt())
+
+
+def test_retries_only_safe_chat_statuses():
+    asyncio.run(_retries_only_safe_chat_statuses())
+
+
+def test_closes_session_between_event_loops():
+    client = None
+
+    async def call(i):
+        nonlocal client
+        stub = await StubBaidu().start()
+        try:
+            if client is None:
+                client = make_client(stub)
+            client.base_url = stub.url
+            assert await client.generate_response(f"run {i}") == f"echo: run {i}"
+        finally:
+            await stub.close()
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        for i in range(3):
+            asyncio.run(call(i))
+        gc.collect()
+
+    unclosed = [str(w.message) for w in caught if "Unclosed" in str(w.message)]
+    assert not unclosed, unclosed
+
+
+if __name__ == "__main__":
+    test_rate_spacing()
+    test_in_flight_cap()
+    test_timeout_cancels_attempt()
+    test_retries_only_safe_chat_statuses()
+    test_closes_session_between_event_loops()
+    print("All AsyncErnieClient tests passed")
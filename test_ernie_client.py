@@ -0,0 +1,244 @@
+"""
+Tests for ErnieClient's HTTP transport against a local stub of the Baidu API.
+
+The stub serves the OAuth token and chat endpoints on 127.0.0.1 and can be
+told to fail the next requests, so connection reuse, timeouts, retries and
+token refresh are checked without network access or credentials.
+
+    python test_ernie_client.py
+"""
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, 'backend')
+
+import requests
+
+from ai_agents.ernie_client import ErnieClient
+
+
+class StubBaidu:
+    """Stand-in for aip.baidubce.com with scriptable failures."""
+
+    def __init__(self):
+        self.token_requests = 0
+        self.chat_requests = 0
+        self.tokens_seen = []
+        self.connections = set()
+        self.expires_in = 2592000
+        self.chat_failures = []  # status codes (or "slow") for the next chat calls
+        self.token_failures = []  # same, for the next token calls
+        self.retry_after = "0"
+        self.revoked = set()
+        self.lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+
+            def log_message(self, *args):
+                pass
+
+            def reply(self, status, body, headers=None):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                try:
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client timed out on a "slow" reply
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+
+                with stub.lock:
+                    stub.connections.add(self.client_address)
+
+                    if url.path == "/oauth/2.0/token":
+                        stub.token_requests += 1
+                        failure = stub.token_failures.pop(0) if stub.token_failures else None
+                    else:
+                        stub.chat_requests += 1
+                        token = query.get("access_token", [None])[0]
+                        stub.tokens_seen.append(token)
+                        failure = stub.chat_failures.pop(0) if stub.chat_failures else None
+
+                if failure == "slow":
+                    time.sleep(0.5)
+                elif failure == 429:
+                    return self.reply(429, {"error": "rate limited"}, {"Retry-After": stub.retry_after})
+                elif failure:
+                    return self.reply(failure, {"error": "unavailable"})
+
+                if url.path == "/oauth/2.0/token":
+                    result = {"access_token": f"token-{stub.token_requests}"}
+                    if stub.expires_in is not None:
+                        result["expires_in"] = stub.expires_in
+                    return self.reply(200, result)
+
+                if token in stub.revoked:
+                    return self.reply(200, {"error_code": 111, "error_msg": "Access token expired"})
+
+                prompt = json.loads(body)["messages"][0]["content"]
+                return self.reply(200, {"result": f"echo: {prompt}"})
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def make_client(stub, **kwargs):
+    options = {"base_url": stub.url, "backoff_base": 0.01, "backoff_max": 0.05}
+    options.update(kwargs)
+    return ErnieClient("key", "secret", **options)
+
+
+def test_reuses_connection():
+    stub = StubBaidu()
+    try:
+        client = make_client(stub)
+        for i in range(5):
+            assert client.generate_response(f"hello {i}") == f"echo: hello {i}"
+        assert stub.token_requests == 1
+        assert len(stub.connections) == 1, f"expected one keep-alive connection, saw {len(stub.connections)}"
+        client.close()
+    finally:
+        stub.close()
+
+
+def test_retries_429_and_gateway_errors():
+    stub = StubBaidu()
+    try:
+        client = make_client(stub, max_retries=3)
+        stub.chat_failures = [429, 503, 502, 504]
+        try:
+            client.generate_response("give up")
+            raise AssertionError("expected an error after the retries ran out")
+        except Exception as e:
+            assert "ERNIE API error" in str(e)
+        assert stub.chat_requests == 4
+
+        stub.chat_failures = [429, 503, 502]
+        assert client.generate_response("retry") == "echo: retry"
+        assert stub.chat_requests == 8
+    finally:
+        stub.close()
+
+
+def test_chat_500_is_not_retried():
+    # The completion may already have been generated and billed
+    stub = StubBaidu()
+    try:
+        client = make_client(stub, max_retries=3)
+        stub.chat_failures = [500]
+        try:
+            client.generate_response("once")
+            raise AssertionError("expected the 500 to be returned")
+        except Exception as e:
+            assert "ERNIE API error" in str(e)
+        assert stub.chat_requests == 1
+    finally:
+        stub.close()
+
+
+def test_read_timeout_retried_for_token_only():
+    stub = StubBaidu()
+    try:
+        stub.token_failures = ["slow"]
+        client = make_client(stub, read_timeout=0.2, max_retries=1)
+        assert stub.token_requests == 2
+
+        stub.chat_failures = ["slow"]
+        try:
+            client.generate_response("too late")
+            raise AssertionError("expected a timeout")
+        except requests.Timeout:
+            pass
+        assert stub.chat_requests == 1
+    finally:
+        stub.close()
+
+
+def test_honours_retry_after_beyond_backoff_max():
+    stub = StubBaidu()
+    try:
+        client = make_client(stub, backoff_max=0.05, retry_after_max=2.0)
+        stub.retry_after = "1"
+        stub.chat_failures = [429]
+        started = time.monotonic()
+        assert client.generate_response("wait") == "echo: wait"
+        assert time.monotonic() - started >= 1.0
+
+        stub.retry_after = "3600"
+        stub.chat_failures = [429]
+        started = time.monotonic()
+        assert client.generate_response("capped") == "echo: capped"
+        assert time.monotonic() - started < 3.0
+    finally:
+        stub.close()
+
+
+def test_missing_expires_in_uses_default_ttl():
+    stub = StubBaidu()
+    try:
+        stub.expires_in = None
+        client = make_client(stub)
+        for i in range(3):
+            client.generate_response(f"call {i}")
+        assert stub.token_requests == 1
+    finally:
+        stub.close()
+
+
+def test_refreshes_token_before_expiry():
+    stub = StubBaidu()
+    try:
+        stub.expires_in = 1
+        client = make_client(stub, token_refresh_margin=0.5)
+        client.generate_response("first")
+        time.sleep(0.6)
+        client.generate_response("second")
+        assert stub.token_requests >= 2
+        assert stub.tokens_seen[-1] != stub.tokens_seen[0]
+    finally:
+        stub.close()
+
+
+def test_refreshes_rejected_token():
+    stub = StubBaidu()
+    try:
+        client = make_client(stub)
+        stub.revoked.add(client.access_token)
+        assert client.generate_response("again") == "echo: again"
+        assert stub.token_requests == 2
+        assert stub.tokens_seen == ["token-1", "token-2"]
+    finally:
+        stub.close()
+
+
+if __name__ == "__main__":
+    test_reuses_connection()
+    test_retries_429_and_gateway_errors()
+    test_chat_500_is_not_retried()
+    test_read_timeout_retried_for_token_only()
+    test_honours_retry_after_beyond_backoff_max()
+    test_missing_expires_in_uses_default_ttl()
+    test_refreshes_token_before_expiry()
+    test_refreshes_rejected_token()
+    print("All ErnieClient transport tests passed")
@@ -0,0 +1,85 @@
+"""
+Query-count regression test for the anomaly endpoints.
+
+Runs the backend in-process against an in-memory SQLite database, seeds a
+few hundred anomalies and checks that the number of SQL statements each
+endpoint issues does not grow with the number of rows.
+
+    python test_query_counts.py
+"""
+import os
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+os.environ.setdefault("DISABLED_MODELS", "ner,paddle_ocr,zero_shot_classifier,embedding_classifier")
+sys.path.insert(0, 'backend')
+
+from sqlalchemy import event
+
+from app import app, db, Expense, AnomalyDetection
+
+N_ANOMALIES = 300
+
+# endpoint -> maximum number of statements allowed, independent of N_ANOMALIES
+ENDPOINTS = {
+    "/anomalies": 2,
+    "/anomalies?limit=50&severity=High": 2,
+    "/anomalies/recent?limit=50": 2,
+    "/anomalies/by-severity": 2,
+    "/auditor/anomalies": 2,
+}
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+
+def seed():
+    db.drop_all()
+    db.create_all()
+    start = datetime(2024, 5, 1)
+    severities = ["Critical", "High", "Medium", "Low"]
+    for i in range(N_ANOMALIES):
+        expense = Expense(filename=f"receipt_{i}.jpg", category="Food", vendor=f"Vendor {i % 25}",
+                          amount=10.0 + i, uploaded_at=start + timedelta(days=i % 200))
+        db.session.add(expense)
+        db.session.flush()
+        db.session.add(AnomalyDetection(expense_id=expense.id, anomaly_type="Unusual Amount",
+                                        severity=severities[i % 4], confidence=80.0,
+                                        description="Seeded anomaly"))
+    db.session.commit()
+
+
+def test_anomaly_endpoints_query_count():
+    with app.app_context():
+        seed()
+        client = app.test_client()
+        failures = []
+
+        for url, limit in ENDPOINTS.items():
+            db.session.expire_all()
+            with count_queries() as statements:
+                response = client.get(url)
+            status = "OK" if response.status_code == 200 and len(statements) <= limit else "FAIL"
+            print(f"{status:4} {url:30} {response.status_code} {len(statements)} queries (limit {limit})")
+            if status == "FAIL":
+                failures.append(url)
+
+        assert not failures, f"Too many queries for: {', '.join(failures)}"
+
+
+if __name__ == "__main__":
+    test_anomaly_endpoints_query_count()
+    print("All query counts within limits")